@@ -6,3 +6,6 @@ class ApiConfig(AppConfig):
     name = 'api'
     verbose_name = 'API'
     verbose_name_plural = 'API'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,142 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from foodgram.constants import CACHE_VERSION_TIMEOUT, RECIPE_CACHE_TIMEOUT
+
+RECIPES_LIST_VERSION = 'recipes:list:version'
+RECIPES_SHARED_VERSION = 'recipes:shared:version'
+TAGS_VERSION = 'tags:version'
+INGREDIENTS_VERSION = 'ingredients:version'
+RECIPE_LIST_CACHE_PARAMS = (
+    'page', 'limit', 'cursor', 'author', 'tags', 'tags_mode', 'search'
+)
+
+
+def recipe_version_key(recipe_id):
+    return f'recipe:{recipe_id}:version'
+
+
+def user_version_key(user_id):
+    return f'user:{user_id}:version'
+
+
+def get_versions(*keys):
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        # Версия, вытесненная из кэша, заменяется новой, а не начинается
+        # заново, чтобы старые записи не стали снова актуальными.
+        for key, version in missing.items():
+            if not cache.add(key, version, CACHE_VERSION_TIMEOUT):
+                version = cache.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*keys):
+    version = time.time_ns()
+    cache.set_many({key: version for key in keys}, CACHE_VERSION_TIMEOUT)
+
+
+def get_request_versions(request, *keys):
+    if not request.user.is_anonymous:
+        keys += (user_version_key(request.user.pk),)
+    return get_versions(*keys)
+
+
+def normalize_query(request, params):
+    query = urlencode([
+        (param, value)
+        for param in params
+        for value in sorted(request.query_params.getlist(param))
+    ])
+    return hashlib.md5(
+        f'{request.scheme}://{request.get_host()}?{query}'.encode()
+    ).hexdigest()
+
+
+def recipe_list_cache_key(request):
+    version, = get_versions(RECIPES_LIST_VERSION)
+    query = normalize_query(request, RECIPE_LIST_CACHE_PARAMS)
+    return f'recipes:list:{version}:{query}'
+
+
+def recipe_detail_cache_key(request, recipe_id):
+    version, shared_version = get_versions(
+        recipe_version_key(recipe_id), RECIPES_SHARED_VERSION
+    )
+    query = normalize_query(request, ())
+    return f'recipe:{recipe_id}:{version}:{shared_version}:{query}'
+
+
+def recipe_fragment_keys(request, recipe_ids):
+    *versions, shared_version = get_versions(
+        *(recipe_version_key(recipe_id) for recipe_id in recipe_ids),
+        RECIPES_SHARED_VERSION
+    )
+    host = normalize_query(request, ())
+    return {
+        recipe_id: f'recipe:{recipe_id}:fragment:{version}:'
+                   f'{shared_version}:{host}'
+        for recipe_id, version in zip(recipe_ids, versions)
+    }
+
+
+def get_recipe_fragments(fragment_keys):
+    cached = cache.get_many(fragment_keys.values())
+    return {
+        recipe_id: cached[key]
+        for recipe_id, key in fragment_keys.items()
+        if key in cached
+    }
+
+
+def set_recipe_fragments(fragment_keys, fragments):
+    cache.set_many(
+        {
+            fragment_keys[recipe_id]: fragment
+            for recipe_id, fragment in fragments.items()
+        },
+        RECIPE_CACHE_TIMEOUT
+    )
+
+
+def cached_response(get_cache_key, get_response):
+    cache_key = get_cache_key()
+    data = cache.get(cache_key)
+    if data is not None:
+        return Response(data)
+    response = get_response()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(cache_key, response.data, RECIPE_CACHE_TIMEOUT)
+    return response
+
+
+def get_last_modified(versions, *dates):
+    return max(
+        [version // 10 ** 9 for version in versions]
+        + [int(date.timestamp()) for date in dates if date is not None]
+    )
+
+
+def conditional_response(request, get_response, validators, last_modified):
+    etag = quote_etag(hashlib.md5(repr(validators).encode()).hexdigest())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = get_response()
+    if response.status_code in (
+        status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+    ):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+    return response
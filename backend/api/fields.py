@@ -1,14 +1,72 @@
 import base64
+import binascii
+import re
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from rest_framework import serializers
 
+from foodgram.constants import UPLOAD_CHUNK_SIZE
+
+
+class TemporaryImageFile(TemporaryUploadedFile):
+    # Хранилище перемещает временный файл при сохранении, поэтому
+    # закрываем его явно: иначе tempfile при сборке мусора попытается
+    # удалить уже отсутствующий путь.
+    def __del__(self):
+        self.close()
+
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'max_size': 'Размер изображения не должен превышать {max_size} байт.',
+        'invalid_base64': 'Некорректные данные изображения в base64.',
+    }
+
+    def decode_base64(self, data):
+        header, _, encoded = data.partition(';base64,')
+        if re.search(r'\s', encoded):
+            encoded = ''.join(encoded.split())
+        if len(encoded) * 3 // 4 > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.fail('max_size', max_size=settings.IMAGE_UPLOAD_MAX_SIZE)
+
+        content_type = header[len('data:'):]
+        upload = TemporaryImageFile(
+            'temp.' + content_type.split('/')[-1], content_type, 0, None
+        )
+        # Декодируем по частям прямо во временный файл, чтобы не держать
+        # в памяти одновременно строку base64 и её декодированную копию.
+        try:
+            for start in range(0, len(encoded), UPLOAD_CHUNK_SIZE):
+                upload.write(base64.b64decode(
+                    encoded[start:start + UPLOAD_CHUNK_SIZE]
+                ))
+        except binascii.Error:
+            upload.close()
+            self.fail('invalid_base64')
+        upload.size = upload.tell()
+        upload.seek(0)
+        return upload
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode_base64(data)
+        if getattr(data, 'size', 0) > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.fail('max_size', max_size=settings.IMAGE_UPLOAD_MAX_SIZE)
 
         return super().to_internal_value(data)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for variant, names in value.get('variants', {}).items():
+            urls[variant] = {}
+            for image_format, name in names.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[variant][image_format] = url
+        return urls
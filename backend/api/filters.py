@@ -1,19 +1,16 @@
 from django_filters import rest_framework
 
-from foodgram.constants import CHOICES_LIST
-from recipes.models import Ingredient, Recipe, Tag
+from foodgram.constants import CHOICES_LIST, TAGS_MODE_ALL, TAGS_MODE_CHOICES
+from recipes.models import Recipe
+from .snapshots import tags
 
 
 def check_filter_enabled(val):
     return val.lower() in ('y', 'yes', 't', 'true', 'on', '1')
 
 
-class IngredientFilter(rest_framework.FilterSet):
-    name = rest_framework.CharFilter(lookup_expr='startswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+def get_tag_choices():
+    return [(tag['slug'], tag['name']) for tag in tags.get_snapshot().items]
 
 
 class RecipeFilter(rest_framework.FilterSet):
@@ -26,22 +23,52 @@ class RecipeFilter(rest_framework.FilterSet):
         method='is_in_shopping_cart_method'
     )
     author = rest_framework.NumberFilter(field_name='author')
-    tags = rest_framework.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
+    search = rest_framework.CharFilter(method='search_method')
+    tags = rest_framework.MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='tags_method'
+    )
+    tags_mode = rest_framework.ChoiceFilter(
+        choices=TAGS_MODE_CHOICES,
+        method='tags_mode_method'
     )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author',
+            'tags',
+            'tags_mode',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'search',
+        )
+
+    def search_method(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return queryset.search(value)
+
+    def tags_method(self, queryset, name, value):
+        tag_ids = [
+            tag['id'] for tag in tags.get_snapshot().items
+            if tag['slug'] in value
+        ]
+        return queryset.with_tags(
+            tag_ids,
+            match_all=self.form.cleaned_data.get('tags_mode') == TAGS_MODE_ALL
+        )
+
+    def tags_mode_method(self, queryset, name, value):
+        return queryset
 
     def is_favorited_method(self, queryset, name, value):
         if self.request.user.is_authenticated and check_filter_enabled(value):
-            return queryset.filter(favorite_set__user=self.request.user)
+            return queryset.favorited_by(self.request.user)
         return queryset
 
     def is_in_shopping_cart_method(self, queryset, name, value):
         if self.request.user.is_authenticated and check_filter_enabled(value):
-            return queryset.filter(shoppingcart_set__user=self.request.user)
+            return queryset.in_shopping_cart_of(self.request.user)
         return queryset
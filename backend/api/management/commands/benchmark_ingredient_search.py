@@ -0,0 +1,57 @@
+import random
+from time import perf_counter_ns
+
+from django.core.management import BaseCommand
+
+from api.search import ingredient_search
+from api.snapshots import ingredients
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = "Замер задержки поиска ингредиентов на каждое нажатие клавиши"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--backend',
+            choices=('memory', 'database'),
+            default='memory'
+        )
+
+    def handle(self, *args, **options):
+        items = ingredients.get_snapshot().items
+        if not items:
+            self.stdout.write(self.style.WARNING("Нет ингредиентов"))
+            return
+        names = [
+            item['name'] for item in random.Random(options['seed']).sample(
+                items, min(options['samples'], len(items))
+            )
+        ]
+        if options['backend'] == 'database':
+            search = ingredient_search.search_database
+        else:
+            search = ingredient_search.get_index().search
+
+        timings = []
+        for name in names:
+            for length in range(1, len(name) + 1):
+                started = perf_counter_ns()
+                search(name[:length], 30)
+                timings.append((perf_counter_ns() - started) / 1000)
+        timings.sort()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Запросов: {len(timings)}, мкс: "
+                f"p50={percentile(timings, 0.5):.0f} "
+                f"p95={percentile(timings, 0.95):.0f} "
+                f"p99={percentile(timings, 0.99):.0f} "
+                f"max={timings[-1]:.0f}"
+            )
+        )
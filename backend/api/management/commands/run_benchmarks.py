@@ -0,0 +1,591 @@
+import base64
+import json
+import secrets
+from contextlib import contextmanager
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from time import perf_counter_ns
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core.workers import wait_for_workers
+from recipes.clicks import click_buffer
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipes.short_codes import make_short_code
+from users.models import Subscription
+from .benchmark_ingredient_search import percentile
+
+User = get_user_model()
+
+BENCHMARK_PASSWORD = 'kX7-mQ2-vR9'
+BENCHMARK_ROUTES = ('api/', 's/')
+SMALL_PAGE = 6
+LARGE_PAGE = 100
+BULK_SIZE = 10
+BENCHMARK_DATABASE_SUFFIX = 'benchmarks'
+
+
+class Step:
+    def __init__(self, name, method, path, budget, status=200, user=None,
+                 data=None, store=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        # Бюджет — потолок SQL-запросов на один запрос к эндпоинту с
+        # запасом в один-два запроса над текущим числом. Страницы на 6 и
+        # 100 объектов делят бюджет, поэтому N+1 он всё равно поймает.
+        self.budget = budget
+        self.status = status
+        self.user = user
+        self.data = data
+        self.store = store
+
+
+def get_image_data():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), (200, 120, 80)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def recipe_data(context, iteration):
+    return {
+        'name': 'Рецепт для замера',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': context['image'],
+        'tags': context['tag_ids'][:2],
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 10 + index}
+            for index, ingredient_id in enumerate(context['ingredient_ids'])
+        ],
+    }
+
+
+def read_steps():
+    steps = []
+    # Запросы с токеном дороже анонимных на постоянную величину.
+    for user, suffix, extra in ((None, 'anon', 0), ('token', 'user', 2)):
+        for size in (SMALL_PAGE, LARGE_PAGE):
+            steps += [
+                [Step(
+                    f'recipes.list.{suffix}.{size}', 'GET',
+                    f'/api/recipes/?limit={size}', 6 + extra, user=user
+                )],
+                [Step(
+                    f'recipes.list.page.{suffix}.{size}', 'GET',
+                    f'/api/recipes/?page=2&limit={size}', 6 + extra,
+                    user=user
+                )],
+                [Step(
+                    f'users.list.{suffix}.{size}', 'GET',
+                    f'/api/users/?limit={size}', 3 + extra, user=user
+                )],
+            ]
+        steps += [
+            [Step(
+                f'recipes.list.tags.{suffix}', 'GET',
+                '/api/recipes/?tags={tag_slug}&limit=6', 7 + extra,
+                user=user
+            )],
+            [Step(
+                f'recipes.list.search.{suffix}', 'GET',
+                '/api/recipes/?search={search}&limit=6', 6 + extra,
+                user=user
+            )],
+            [Step(
+                f'recipes.detail.{suffix}', 'GET',
+                '/api/recipes/{recipe}/', 5 + extra, user=user
+            )],
+            [Step(
+                f'users.detail.{suffix}', 'GET',
+                '/api/users/{author}/', 2 + extra, user=user
+            )],
+        ]
+    return steps + [
+        [Step('api.root', 'GET', '/api/', 0)],
+        [Step('ingredients.list', 'GET', '/api/ingredients/', 2)],
+        [Step(
+            'ingredients.search', 'GET',
+            '/api/ingredients/?name={ingredient_prefix}', 0
+        )],
+        [Step(
+            'ingredients.detail', 'GET', '/api/ingredients/{ingredient}/', 0
+        )],
+        [Step('tags.list', 'GET', '/api/tags/', 0)],
+        [Step('tags.detail', 'GET', '/api/tags/{tag}/', 0)],
+        [Step(
+            'recipes.get_link', 'GET', '/api/recipes/{recipe}/get-link/', 6
+        )],
+        [Step('short_link.redirect', 'GET', '/s/{short_code}/', 1, 302)],
+        [Step(
+            'recipes.list.favorited', 'GET',
+            '/api/recipes/?is_favorited=1&limit=6', 8, user='token'
+        )],
+        [Step(
+            'recipes.list.in_cart', 'GET',
+            '/api/recipes/?is_in_shopping_cart=1&limit=6', 6, user='token'
+        )],
+        [Step('users.me', 'GET', '/api/users/me/', 3, user='token')],
+        [Step(
+            'users.subscriptions.6', 'GET',
+            f'/api/users/subscriptions/?limit={SMALL_PAGE}&recipes_limit=3',
+            6, user='token'
+        )],
+        [Step(
+            'users.subscriptions.100', 'GET',
+            f'/api/users/subscriptions/?limit={LARGE_PAGE}&recipes_limit=3',
+            6, user='token'
+        )],
+        [Step(
+            'recipes.download_shopping_cart', 'GET',
+            '/api/recipes/download_shopping_cart/', 3, user='token'
+        )],
+    ]
+
+
+def write_steps():
+    return [
+        [
+            Step(
+                'recipes.favorite.add', 'POST',
+                '/api/recipes/{recipe}/favorite/', 7, 201, 'token'
+            ),
+            Step(
+                'recipes.favorite.remove', 'DELETE',
+                '/api/recipes/{recipe}/favorite/', 6, 204, 'token'
+            ),
+        ],
+        [
+            Step(
+                'recipes.shopping_cart.add', 'POST',
+                '/api/recipes/{recipe}/shopping_cart/', 7, 201, 'token'
+            ),
+            Step(
+                'recipes.shopping_cart.remove', 'DELETE',
+                '/api/recipes/{recipe}/shopping_cart/', 7, 204, 'token'
+            ),
+        ],
+        [
+            Step(
+                'recipes.favorite_bulk.add', 'POST',
+                '/api/recipes/favorite/', 8, 200, 'token',
+                lambda context, iteration: {'ids': context['bulk_recipes']}
+            ),
+            Step(
+                'recipes.favorite_bulk.remove', 'DELETE',
+                '/api/recipes/favorite/', 8, 200, 'token',
+                lambda context, iteration: {'ids': context['bulk_recipes']}
+            ),
+        ],
+        [
+            Step(
+                'recipes.shopping_cart_bulk.add', 'POST',
+                '/api/recipes/shopping_cart/', 8, 200, 'token',
+                lambda context, iteration: {'ids': context['bulk_recipes']}
+            ),
+            Step(
+                'recipes.shopping_cart_bulk.remove', 'DELETE',
+                '/api/recipes/shopping_cart/', 8, 200, 'token',
+                lambda context, iteration: {'ids': context['bulk_recipes']}
+            ),
+        ],
+        [
+            Step(
+                'users.subscribe.add', 'POST',
+                '/api/users/{author}/subscribe/', 9, 201, 'token'
+            ),
+            Step(
+                'users.subscribe.remove', 'DELETE',
+                '/api/users/{author}/subscribe/', 6, 204, 'token'
+            ),
+        ],
+        [
+            Step(
+                'users.subscribe_bulk.add', 'POST',
+                '/api/users/subscribe/', 8, 200, 'token',
+                lambda context, iteration: {'ids': context['bulk_authors']}
+            ),
+            Step(
+                'users.subscribe_bulk.remove', 'DELETE',
+                '/api/users/subscribe/', 8, 200, 'token',
+                lambda context, iteration: {'ids': context['bulk_authors']}
+            ),
+        ],
+        [
+            Step(
+                'users.avatar.put', 'PUT', '/api/users/me/avatar/', 7, 200,
+                'token', lambda context, iteration: {
+                    'avatar': context['image']
+                }
+            ),
+            Step(
+                'users.avatar.delete', 'DELETE', '/api/users/me/avatar/', 5,
+                204, 'token'
+            ),
+        ],
+        [
+            Step(
+                'recipes.create', 'POST', '/api/recipes/', 14, 201, 'token',
+                recipe_data, ('created', 'id')
+            ),
+            Step(
+                'recipes.update', 'PUT', '/api/recipes/{created}/', 13, 200,
+                'token', recipe_data
+            ),
+            Step(
+                'recipes.partial_update', 'PATCH', '/api/recipes/{created}/',
+                13, 200, 'token', recipe_data
+            ),
+            Step(
+                'recipes.image', 'PUT', '/api/recipes/{created}/image/', 6,
+                200, 'token', lambda context, iteration: {
+                    'image': context['image']
+                }
+            ),
+            Step(
+                'recipes.clicks', 'GET', '/api/recipes/{created}/clicks/', 6,
+                200, 'token'
+            ),
+            Step(
+                'recipes.delete', 'DELETE', '/api/recipes/{created}/', 16,
+                204, 'token'
+            ),
+        ],
+        [
+            Step(
+                'users.create', 'POST', '/api/users/', 6, 201,
+                data=lambda context, iteration: {
+                    'email': f'{context["prefix"]}{iteration}@example.com',
+                    'username': f'{context["prefix"]}{iteration}',
+                    'first_name': 'Имя',
+                    'last_name': 'Фамилия',
+                    'password': BENCHMARK_PASSWORD,
+                }
+            ),
+        ],
+        [
+            Step(
+                'users.set_password', 'POST', '/api/users/set_password/', 12,
+                204, 'token', lambda context, iteration: {
+                    'current_password': BENCHMARK_PASSWORD,
+                    'new_password': BENCHMARK_PASSWORD,
+                }
+            ),
+        ],
+        [
+            Step(
+                'auth.token.login', 'POST', '/api/auth/token/login/', 7, 200,
+                data=lambda context, iteration: {
+                    'email': context['login_email'],
+                    'password': BENCHMARK_PASSWORD,
+                },
+                store=('login_token', 'auth_token')
+            ),
+            Step(
+                'auth.token.logout', 'POST', '/api/auth/token/logout/', 4,
+                204, 'login_token'
+            ),
+        ],
+    ]
+
+
+def set_database_name(name):
+    connection.close()
+    settings.DATABASES[connection.alias]['NAME'] = name
+    connection.settings_dict['NAME'] = name
+
+
+@contextmanager
+def disposable_database():
+    # Замеры пишут в копию базы в режиме autocommit: on_commit-хуки
+    # (сброс кэша, генерация картинок) срабатывают как в проде, а
+    # исходные данные не меняются.
+    creation = connection.creation
+    name = connection.settings_dict['NAME']
+    connection.close()
+    creation.clone_test_db(
+        BENCHMARK_DATABASE_SUFFIX, verbosity=0, autoclobber=True
+    )
+    set_database_name(
+        creation.get_test_db_clone_settings(BENCHMARK_DATABASE_SUFFIX)['NAME']
+    )
+    try:
+        yield
+    finally:
+        # Картинки пишут результат в копию, её нельзя удалять раньше.
+        wait_for_workers()
+        set_database_name(name)
+        creation.destroy_test_db(
+            verbosity=0, suffix=BENCHMARK_DATABASE_SUFFIX
+        )
+
+
+def get_routes():
+    # Все пары «маршрут, метод» API и коротких ссылок: набор замеров
+    # обязан покрывать каждую из них.
+    routes = set()
+
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            route = URLResolver._join_route(prefix, str(pattern.pattern))
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns, route)
+                continue
+            if '<format>' in route or not route.startswith(BENCHMARK_ROUTES):
+                continue
+            callback = pattern.callback
+            methods = getattr(callback, 'actions', None)
+            if methods is None:
+                view_class = getattr(callback, 'cls', None)
+                methods = [
+                    method for method in ('get', 'post', 'put', 'patch',
+                                          'delete')
+                    if hasattr(view_class, method)
+                ] if view_class else ['get']
+            routes.update((route, method.upper()) for method in methods)
+
+    walk(get_resolver().url_patterns, '')
+    return routes
+
+
+class Command(BaseCommand):
+    help = "Замер времени и числа SQL-запросов для всех эндпоинтов API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help="Файл для результатов в JSON")
+        parser.add_argument(
+            '--compare', help="JSON с результатами предыдущего прогона"
+        )
+        parser.add_argument(
+            '--filter', default='', help="Подстрока в имени замера"
+        )
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError(
+                "Нет данных для замеров: сначала запустите generate_fake_data"
+            )
+        groups = [
+            [step for step in group if options['filter'] in step.name]
+            for group in read_steps() + write_steps()
+        ]
+        self.check_coverage(
+            [step for group in read_steps() + write_steps() for step in group]
+        )
+
+        # База, кэш и медиафайлы — временные.
+        with TemporaryDirectory() as media_root, override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            MEDIA_ROOT=media_root,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'benchmarks',
+            }},
+        ), disposable_database():
+            context = self.prepare()
+            results, failures = self.run(
+                [group for group in groups if group],
+                context,
+                options['repeat']
+            )
+            click_buffer.take()
+
+        self.report(results)
+        if options['compare']:
+            self.compare(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'vendor': connection.vendor,
+                    'repeat': options['repeat'],
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2)
+        if failures:
+            raise CommandError('\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS("Бюджеты запросов соблюдены"))
+
+    def check_coverage(self, steps):
+        covered = {
+            (resolve(step.path.split('?')[0]).route, step.method)
+            for step in steps
+        }
+        missing = sorted(get_routes() - covered)
+        if missing:
+            raise CommandError(
+                "Нет замеров для маршрутов: " + ', '.join(
+                    f'{method} {route}' for route, method in missing
+                )
+            )
+
+    def prepare(self):
+        # Вход и выход — под отдельным пользователем: выход удаляет токен.
+        prefix = f'benchmark{secrets.token_hex(4)}'
+        user, login_user = (
+            User.objects.create_user(
+                username=f'{prefix}{suffix}',
+                email=f'{prefix}{suffix}@example.com',
+                password=BENCHMARK_PASSWORD,
+                first_name='Замер',
+                last_name='Производительности'
+            )
+            for suffix in ('', 'login')
+        )
+        recipes = list(
+            Recipe.objects.exclude(author=user).order_by(
+                '-favorites_count', 'id'
+            ).values_list('id', flat=True)[:3 * BULK_SIZE + 1]
+        )
+        authors = list(
+            User.objects.exclude(pk=user.pk).filter(
+                recipes_count__gt=0
+            ).order_by('-recipes_count', 'id').values_list(
+                'id', flat=True
+            )[:2 * BULK_SIZE + 1]
+        )
+        if len(recipes) <= 3 * BULK_SIZE or len(authors) <= 2 * BULK_SIZE:
+            raise CommandError("Слишком мало данных для замеров")
+        for recipe_id in recipes[1:BULK_SIZE + 1]:
+            ShoppingCart.objects.create(user=user, recipe_id=recipe_id)
+            Favorite.objects.create(user=user, recipe_id=recipe_id)
+        for author_id in authors[BULK_SIZE + 1:]:
+            Subscription.objects.create(user=user, author_id=author_id)
+        ingredient = Ingredient.objects.order_by('id').first()
+        tag = Tag.objects.order_by('id').first()
+        return {
+            'prefix': prefix,
+            'login_email': login_user.email,
+            'token': Token.objects.create(user=user).key,
+            'image': get_image_data(),
+            'recipe': recipes[0],
+            'short_code': make_short_code(recipes[0]),
+            'bulk_recipes': recipes[-BULK_SIZE:],
+            'author': authors[0],
+            'bulk_authors': authors[1:BULK_SIZE + 1],
+            'ingredient': ingredient.id,
+            'ingredient_prefix': ingredient.name[:3],
+            'ingredient_ids': list(
+                Ingredient.objects.order_by('id').values_list(
+                    'id', flat=True
+                )[:BULK_SIZE]
+            ),
+            'tag': tag.id,
+            'tag_slug': tag.slug,
+            'tag_ids': list(
+                Tag.objects.order_by('id').values_list('id', flat=True)
+            ),
+            'search': Recipe.objects.get(pk=recipes[0]).name.split()[0],
+        }
+
+    def request(self, client, step, context, iteration):
+        headers = {}
+        if step.user:
+            headers['HTTP_AUTHORIZATION'] = f'Token {context[step.user]}'
+        data = step.data(context, iteration) if step.data else None
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter_ns()
+            response = client.generic(
+                step.method,
+                step.path.format(**context),
+                json.dumps(data) if data is not None else '',
+                'application/json',
+                **headers
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = perf_counter_ns() - started
+        if step.store:
+            # Следующие шаги группы зависят от ответа, продолжать нельзя.
+            if response.status_code != step.status:
+                raise CommandError(
+                    f'{step.name}: статус {response.status_code}, '
+                    f'{response.content.decode()[:500]}'
+                )
+            key, field = step.store
+            context[key] = response.json()[field]
+        return response.status_code, elapsed, len(queries)
+
+    def run(self, groups, context, repeat):
+        client = Client()
+        measured = {}
+        for iteration in range(repeat):
+            for group in groups:
+                for step in group:
+                    measured.setdefault(step, []).append(
+                        self.request(client, step, context, iteration)
+                    )
+        results = {}
+        failures = []
+        for step, samples in measured.items():
+            timings = sorted(elapsed / 10 ** 6 for _, elapsed, _ in samples)
+            queries = max(count for _, _, count in samples)
+            statuses = sorted({status for status, _, _ in samples})
+            results[step.name] = {
+                'method': step.method,
+                'path': step.path,
+                'statuses': statuses,
+                'p50': percentile(timings, 0.5),
+                'p95': percentile(timings, 0.95),
+                'p99': percentile(timings, 0.99),
+                'max': timings[-1],
+                'queries': queries,
+                'budget': step.budget,
+            }
+            if statuses != [step.status]:
+                failures.append(
+                    f'{step.name}: статусы {statuses}, ожидался {step.status}'
+                )
+            if queries > step.budget:
+                failures.append(
+                    f'{step.name}: {queries} запросов при бюджете '
+                    f'{step.budget}'
+                )
+        return results, failures
+
+    def report(self, results):
+        for name, result in results.items():
+            line = (
+                f"{name:<36} {result['method']:<6} "
+                f"p50={result['p50']:8.2f} p95={result['p95']:8.2f} "
+                f"p99={result['p99']:8.2f} мс  "
+                f"запросов: {result['queries']}/{result['budget']}"
+            )
+            if result['queries'] > result['budget']:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+    def compare(self, results, path):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)['results']
+        self.stdout.write(f"Сравнение с {path}:")
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            change = (
+                (result['p50'] - before['p50']) / before['p50'] * 100
+                if before['p50'] else 0
+            )
+            self.stdout.write(
+                f"{name:<36} p50 {before['p50']:8.2f} -> "
+                f"{result['p50']:8.2f} мс ({change:+.0f}%), "
+                f"запросов {before['queries']} -> {result['queries']}"
+            )
@@ -1,8 +1,132 @@
-from rest_framework.pagination import PageNumberPagination
+import json
 
-from foodgram.constants import PAGE_SIZE, PAGE_SIZE_QUERY_PARAM
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+
+from foodgram.constants import (
+    CURSOR_QUERY_PARAM,
+    PAGE_SIZE,
+    PAGE_SIZE_QUERY_PARAM,
+)
+
+
+class KeysetPagination(CursorPagination):
+    cursor_query_param = CURSOR_QUERY_PARAM
+    page_size_query_param = PAGE_SIZE_QUERY_PARAM
+    page_size = PAGE_SIZE
+    ordering = ('-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = (
+            _reverse_ordering(self.ordering) if reverse else self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        has_position = (
+            self.cursor is not None and self.cursor.position is not None
+        )
+        if has_position:
+            queryset = queryset.filter(self.get_keyset_filter(
+                queryset.model, ordering, self.cursor.position
+            ))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_position, has_more
+        else:
+            self.has_next, self.has_previous = has_more, has_position
+        return self.page
+
+    def get_keyset_filter(self, model, ordering, position):
+        try:
+            values = json.loads(position)
+            if len(values) != len(ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(order.lstrip('-')).to_python(value)
+                for order, value in zip(ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        keyset_filter = Q()
+        equal = Q()
+        for order, value in zip(ordering, values):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            keyset_filter |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return keyset_filter
+
+    def get_position(self, instance):
+        return json.dumps([
+            str(getattr(instance, order.lstrip('-')))
+            for order in self.ordering
+        ])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = (
+            self.get_position(self.page[-1]) if self.page
+            else self.cursor.position
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = (
+            self.get_position(self.page[0]) if self.page
+            else self.cursor.position
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position)
+        )
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = PAGE_SIZE_QUERY_PARAM
     page_size = PAGE_SIZE
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        # Поиск упорядочен по релевантности, а курсор — по дате: с поиском
+        # остаются номера страниц, иначе порядок молча сменился бы.
+        return (
+            CURSOR_QUERY_PARAM in request.query_params
+            and not request.query_params.get('search', '').strip()
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = KeysetPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
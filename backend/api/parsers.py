@@ -0,0 +1,39 @@
+from functools import partial
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import (
+    BaseParser,
+    DataAndFiles,
+    JSONParser,
+    MultiPartParser,
+)
+
+from foodgram.constants import UPLOAD_CHUNK_SIZE
+from .fields import TemporaryImageFile
+
+
+class ImageUploadParser(BaseParser):
+    media_type = 'image/*'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            raise ParseError('Файл изображения не передан.')
+        content_type = media_type.split(';')[0].strip()
+        upload = TemporaryImageFile(
+            'upload.' + content_type.split('/')[-1], content_type, 0, None
+        )
+        for chunk in iter(partial(stream.read, UPLOAD_CHUNK_SIZE), b''):
+            upload.write(chunk)
+            if upload.tell() > settings.IMAGE_UPLOAD_MAX_SIZE:
+                upload.close()
+                raise ParseError(
+                    'Размер изображения не должен превышать '
+                    f'{settings.IMAGE_UPLOAD_MAX_SIZE} байт.'
+                )
+        upload.size = upload.tell()
+        upload.seek(0)
+        return DataAndFiles({}, {'file': upload})
+
+
+IMAGE_PARSERS = (JSONParser, MultiPartParser, ImageUploadParser)
@@ -14,3 +14,8 @@ class IsAuthorOrAdminOrReadOnlyPermission(permissions.BasePermission):
             or obj.author == request.user
             or request.user.is_superuser
         )
+
+
+class IsAuthorPermission(permissions.IsAuthenticated):
+    def has_object_permission(self, request, view, obj):
+        return obj.author == request.user
@@ -0,0 +1,149 @@
+import abc
+import csv
+import io
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+from rest_framework import renderers
+
+from core.workers import get_process_pool
+from foodgram.constants import (
+    SHOPPING_LIST_FIELDS,
+    SHOPPING_LIST_PDF_FONT_SIZE,
+    SHOPPING_LIST_PDF_LINE_HEIGHT,
+    SHOPPING_LIST_PDF_MARGIN,
+    SHOPPING_LIST_PDF_PAGE_SIZE,
+    SHOPPING_LIST_PDF_RESOLUTION,
+    SHOPPING_LIST_TITLE,
+)
+
+
+def format_ingredient(ingredient):
+    return (
+        f'{ingredient["name"]} - '
+        f'{ingredient["amount"]} '
+        f'{ingredient["measurement_unit"]}'
+    )
+
+
+def get_error_lines(data):
+    return [str(value) for value in data.values()]
+
+
+def render_pdf(lines, font_path):
+    font = ImageFont.truetype(font_path, SHOPPING_LIST_PDF_FONT_SIZE)
+    width, height = SHOPPING_LIST_PDF_PAGE_SIZE
+    lines_per_page = (
+        (height - 2 * SHOPPING_LIST_PDF_MARGIN)
+        // SHOPPING_LIST_PDF_LINE_HEIGHT
+    )
+    pages = []
+    for start in range(0, len(lines), lines_per_page):
+        page = Image.new('RGB', SHOPPING_LIST_PDF_PAGE_SIZE, 'white')
+        draw = ImageDraw.Draw(page)
+        for index, line in enumerate(lines[start:start + lines_per_page]):
+            draw.text(
+                (
+                    SHOPPING_LIST_PDF_MARGIN,
+                    SHOPPING_LIST_PDF_MARGIN
+                    + index * SHOPPING_LIST_PDF_LINE_HEIGHT
+                ),
+                line,
+                fill='black',
+                font=font
+            )
+        pages.append(page)
+    buffer = io.BytesIO()
+    pages[0].save(
+        buffer,
+        'PDF',
+        save_all=True,
+        append_images=pages[1:],
+        resolution=SHOPPING_LIST_PDF_RESOLUTION
+    )
+    return buffer.getvalue()
+
+
+class EchoBuffer:
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(renderers.BaseRenderer, metaclass=abc.ABCMeta):
+    charset = 'utf-8'
+    streaming = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return '\n'.join(get_error_lines(data)).encode(self.charset)
+        return b''.join(self.stream(data))
+
+    @abc.abstractmethod
+    def stream(self, ingredients):
+        raise NotImplementedError
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield f'{SHOPPING_LIST_TITLE}\n\n'.encode(self.charset)
+        for ingredient in ingredients:
+            yield f'{format_ingredient(ingredient)}\n'.encode(self.charset)
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(SHOPPING_LIST_FIELDS).encode(self.charset)
+        for ingredient in ingredients:
+            yield writer.writerow(
+                [ingredient[field] for field in SHOPPING_LIST_FIELDS]
+            ).encode(self.charset)
+
+
+class ShoppingListJSONRenderer(renderers.JSONRenderer):
+    streaming = True
+
+    def stream(self, ingredients):
+        yield b'['
+        for index, ingredient in enumerate(ingredients):
+            if index:
+                yield b','
+            yield super().render(ingredient)
+        yield b']'
+
+
+class ShoppingListPDFRenderer(renderers.BaseRenderer):
+    # Pillow собирает PDF из растровых страниц только целиком, поэтому
+    # выгрузка в PDF не потоковая: список читается полностью, а файл
+    # отдаётся обычным ответом. Растеризация идёт в пуле процессов:
+    # поток запроса ждёт результат, не удерживая GIL, а размер пула
+    # ограничивает число одновременных выгрузок.
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    streaming = False
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            lines = get_error_lines(data)
+        else:
+            lines = [SHOPPING_LIST_TITLE, ''] + [
+                format_ingredient(ingredient) for ingredient in data
+            ]
+        return get_process_pool().submit(
+            render_pdf, lines, settings.SHOPPING_LIST_FONT_PATH
+        ).result()
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer,
+)
@@ -0,0 +1,163 @@
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import DatabaseError, connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+
+from foodgram.constants import (
+    INGREDIENT_SEARCH_LIMIT,
+    TRIGRAM_SIMILARITY_THRESHOLD,
+)
+from recipes.models import Ingredient
+from .snapshots import ingredients
+
+PREFIX_RANK = 0
+WORD_START_RANK = 1
+SUBSTRING_RANK = 2
+FUZZY_RANK = 3
+
+
+def normalize(value):
+    return ' '.join(value.lower().replace('ё', 'е').split())
+
+
+def get_trigrams(value):
+    trigrams = set()
+    for word in re.findall(r'\w+', value):
+        padded = f'  {word} '
+        trigrams.update(
+            padded[i:i + 3] for i in range(len(padded) - 2)
+        )
+    return trigrams
+
+
+class IngredientIndex:
+    def __init__(self, version, items):
+        self.version = version
+        self.items = items
+        self.names = [normalize(item['name']) for item in items]
+        self.prefixes = sorted(
+            (name, position) for position, name in enumerate(self.names)
+        )
+        self.word_starts = sorted(
+            (name[match.start():], position)
+            for position, name in enumerate(self.names)
+            for match in re.finditer(r'(?<=\W)\w', name)
+        )
+        self.trigram_counts = []
+        self.postings = defaultdict(list)
+        for position, name in enumerate(self.names):
+            trigrams = get_trigrams(name)
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.postings[trigram].append(position)
+
+    @staticmethod
+    def scan_prefix(entries, query):
+        start = bisect_left(entries, (query,))
+        for name, position in entries[start:]:
+            if not name.startswith(query):
+                break
+            yield position
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        query = normalize(query)
+        if not query:
+            return []
+        ranked = {}
+
+        def add(positions, rank, score=0.0):
+            for position in positions:
+                if position not in ranked:
+                    ranked[position] = (rank, -score)
+
+        add(self.scan_prefix(self.prefixes, query), PREFIX_RANK)
+        add(self.scan_prefix(self.word_starts, query), WORD_START_RANK)
+
+        query_trigrams = get_trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.postings.get(trigram, ()))
+        candidates = (
+            shared if len(query) >= 3 else range(len(self.names))
+        )
+        add(
+            (
+                position for position in candidates
+                if query in self.names[position]
+            ),
+            SUBSTRING_RANK
+        )
+        for position, common in shared.items():
+            similarity = common / (
+                len(query_trigrams) + self.trigram_counts[position] - common
+            )
+            if similarity >= TRIGRAM_SIMILARITY_THRESHOLD:
+                add((position,), FUZZY_RANK, similarity)
+
+        best = sorted(
+            ranked,
+            key=lambda position: (*ranked[position], self.names[position])
+        )[:limit]
+        return [self.items[position] for position in best]
+
+
+class IngredientSearch:
+    index = None
+
+    def get_index(self):
+        snapshot = ingredients.get_snapshot()
+        index = self.index
+        if index is None or index.version != snapshot.version:
+            index = IngredientIndex(snapshot.version, snapshot.items)
+            self.index = index
+        return index
+
+    def search_database(self, query, limit):
+        query = normalize(query)
+        return list(
+            Ingredient.objects.annotate(
+                lower_name=Lower('name'),
+                similarity=TrigramSimilarity(Lower('name'), query),
+            ).annotate(
+                rank=Case(
+                    When(lower_name__startswith=query, then=Value(
+                        PREFIX_RANK
+                    )),
+                    When(lower_name__contains=f' {query}', then=Value(
+                        WORD_START_RANK
+                    )),
+                    When(lower_name__contains=query, then=Value(
+                        SUBSTRING_RANK
+                    )),
+                    default=Value(FUZZY_RANK),
+                    output_field=IntegerField(),
+                )
+            ).filter(
+                Q(lower_name__contains=query)
+                | Q(similarity__gte=TRIGRAM_SIMILARITY_THRESHOLD)
+            ).order_by(
+                'rank', '-similarity', 'lower_name'
+            ).values('id', 'name', 'measurement_unit')[:limit]
+        )
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        if (
+            settings.INGREDIENT_SEARCH_BACKEND == 'database'
+            and connection.vendor == 'postgresql'
+        ):
+            return self.search_database(query, limit)
+        return self.get_index().search(query, limit)
+
+    def warm_up(self):
+        try:
+            self.get_index()
+        except DatabaseError:
+            pass
+
+
+ingredient_search = IngredientSearch()
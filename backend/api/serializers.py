@@ -1,23 +1,53 @@
+import json
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Manager, prefetch_related_objects
+from django.http import QueryDict
 
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
-from foodgram.constants import MIN_INGREDIENT_AMOUNT, MIN_VALUE_ZERO
+from foodgram.constants import (
+    BULK_MAX_IDS,
+    MIN_INGREDIENT_AMOUNT,
+    MIN_VALUE_ZERO,
+    SELF_SUBSCRIPTION_MESSAGE,
+)
 from recipes.models import (
     Favorite,
-    Ingredient,
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingListItem,
+    ShortLinkClick,
     Tag,
+    get_recipe_prefetches,
 )
 from users.models import Subscription
-from .fields import Base64ImageField
+from . import snapshots
+from .cache import (
+    get_recipe_fragments,
+    recipe_fragment_keys,
+    set_recipe_fragments,
+)
+from .fields import Base64ImageField, ImageVariantsField
 
 User = get_user_model()
 
 
+def get_recipe_limit(request):
+    # recipes_limit описан в схеме API и шлётся фронтендом, recipe_limit
+    # остаётся для старых клиентов.
+    params = request.query_params
+    try:
+        limit = int(params.get('recipes_limit', params.get('recipe_limit')))
+    except (ValueError, TypeError):
+        return None
+    return limit if limit > MIN_VALUE_ZERO else None
+
+
 class AvatarSerializer(serializers.ModelSerializer):
     avatar = Base64ImageField(required=True)
 
@@ -28,6 +58,7 @@ class AvatarSerializer(serializers.ModelSerializer):
 
 class UserGetSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = User
@@ -39,21 +70,45 @@ class UserGetSerializer(UserSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_variants',
         )
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
         return (
             not request.user.is_anonymous
-            and Subscription.objects.filter(
-                author=obj, user=request.user
-            ).exists()
+            and obj.id in self.get_subscribed_author_ids(request.user)
         )
 
+    def get_subscribed_author_ids(self, user):
+        # Контекст общий для всех вложенных сериализаторов ответа,
+        # поэтому подписки пользователя загружаются один раз за запрос.
+        if 'subscribed_author_ids' not in self.context:
+            self.context['subscribed_author_ids'] = set(
+                Subscription.objects.filter(
+                    user=user
+                ).values_list('author_id', flat=True)
+            )
+        return self.context['subscribed_author_ids']
+
+
+class UserWithRecipesListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        authors = list(data.all() if isinstance(data, Manager) else data)
+        recipes = Recipe.objects.filter(author__in=authors)
+        limit = get_recipe_limit(self.context.get('request'))
+        if limit:
+            recipes = recipes.latest_per_author(limit)
+        previews = defaultdict(list)
+        for recipe in recipes.order_by('-pub_date', '-id'):
+            previews[recipe.author_id].append(recipe)
+        for author in authors:
+            author.recipes_preview = previews[author.id]
+        return super().to_representation(authors)
+
 
 class UserWithRecipesSerializer(UserGetSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -61,22 +116,18 @@ class UserWithRecipesSerializer(UserGetSerializer):
             'recipes',
             'recipes_count',
         )
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        list_serializer_class = UserWithRecipesListSerializer
 
     def get_recipes(self, object):
         request = self.context.get('request')
         context = {'request': request}
-        recipe_limit = request.query_params.get('recipe_limit')
-        queryset = object.recipes.all()
-        if recipe_limit:
-            try:
-                limit = int(recipe_limit)
-                if limit > MIN_VALUE_ZERO:
-                    queryset = queryset[:limit]
-            except (ValueError, TypeError):
-                pass
+        if hasattr(object, 'recipes_preview'):
+            queryset = object.recipes_preview
+        else:
+            queryset = object.recipes.all()
+            limit = get_recipe_limit(request)
+            if limit:
+                queryset = queryset[:limit]
 
         return RecipeShortSerializer(queryset, context=context, many=True).data
 
@@ -117,9 +168,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def validate_author(self, value):
         if self.context.get('request').user == value:
-            raise serializers.ValidationError(
-                'Подписка на самого себя не возможна!'
-            )
+            raise serializers.ValidationError(SELF_SUBSCRIPTION_MESSAGE)
         return value
 
     def to_representation(self, instance):
@@ -129,12 +178,6 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         ).data
 
 
-class IngredientSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Ingredient
-        fields = ('id', 'name', 'measurement_unit')
-
-
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
     id = serializers.PrimaryKeyRelatedField(
         source='ingredient',
@@ -156,10 +199,35 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class IngredientInRecipeWriteListSerializer(serializers.ListSerializer):
+    default_error_messages = {
+        'does_not_exist': 'Ингредиент с id {pk_value} не существует.',
+    }
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        missing = snapshots.ingredients.get_missing_ids(
+            item['id'] for item in items
+        )
+        if missing:
+            raise serializers.ValidationError([
+                {
+                    'id': [self.error_messages['does_not_exist'].format(
+                        pk_value=item['id']
+                    )]
+                } if item['id'] in missing else {}
+                for item in items
+            ])
+        return items
+
+
 class IngredientInRecipeWriteSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(min_value=MIN_INGREDIENT_AMOUNT)
 
+    class Meta:
+        list_serializer_class = IngredientInRecipeWriteListSerializer
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -167,6 +235,12 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug')
 
 
+class RecipeGetListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        return self.child.represent_recipes(recipes)
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserGetSerializer()
@@ -175,8 +249,9 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         many=True,
         read_only=True
     )
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -189,41 +264,68 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
+        list_serializer_class = RecipeGetListSerializer
 
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        return (
-            not request.user.is_anonymous
-            and Favorite.objects.filter(
-                recipe=obj, user=request.user
-            ).exists()
+    def to_representation(self, instance):
+        return self.represent_recipes([instance])[0]
+
+    def represent_recipes(self, recipes):
+        fragment_keys = recipe_fragment_keys(
+            self.context.get('request'), [recipe.id for recipe in recipes]
         )
+        fragments = get_recipe_fragments(fragment_keys)
+        missing = [recipe for recipe in recipes if recipe.id not in fragments]
+        if missing:
+            prefetch_related_objects(missing, *get_recipe_prefetches())
+            new_fragments = {
+                recipe.id: self.get_fragment(recipe) for recipe in missing
+            }
+            set_recipe_fragments(fragment_keys, new_fragments)
+            fragments.update(new_fragments)
+        return [
+            self.add_user_fields(fragments[recipe.id], recipe)
+            for recipe in recipes
+        ]
 
-    def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        return (
-            not request.user.is_anonymous
-            and ShoppingCart.objects.filter(
-                recipe=obj, user=request.user
-            ).exists()
+    def get_fragment(self, recipe):
+        return super().to_representation(recipe)
+
+    def add_user_fields(self, fragment, recipe):
+        user = self.context.get('request').user
+        subscribed_author_ids = (
+            set() if user.is_anonymous
+            else self.fields['author'].get_subscribed_author_ids(user)
         )
+        data = fragment.copy()
+        data['author'] = fragment['author'].copy()
+        data['author']['is_subscribed'] = (
+            recipe.author_id in subscribed_author_ids
+        )
+        data['is_favorited'] = recipe.is_favorited
+        data['is_in_shopping_cart'] = recipe.is_in_shopping_cart
+        return data
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class RecipePostSerializer(serializers.ModelSerializer):
+    default_error_messages = {
+        'tag_does_not_exist': serializers.PrimaryKeyRelatedField
+        .default_error_messages['does_not_exist'],
+    }
+
     author = UserGetSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all()
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = IngredientInRecipeWriteSerializer(many=True)
     image = Base64ImageField()
 
@@ -240,17 +342,93 @@ class RecipePostSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.parse_form_data(data)
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def parse_form_data(data):
+        parsed = data.dict()
+        for field_name in ('tags', 'ingredients'):
+            if field_name not in data:
+                continue
+            parsed[field_name] = []
+            for value in data.getlist(field_name):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+                parsed[field_name] += (
+                    value if isinstance(value, list) else [value]
+                )
+        return parsed
+
     @staticmethod
     def save_ingredients(recipe, ingredients):
         IngredientInRecipe.objects.bulk_create(
             IngredientInRecipe(
                 recipe=recipe,
-                ingredient=ingredient['id'],
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount']
             )
             for ingredient in ingredients
         )
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            item.ingredient_id: item
+            for item in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        deltas = {
+            ingredient_id: amount - getattr(current.get(ingredient_id),
+                                            'amount', 0)
+            for ingredient_id, amount in amounts.items()
+        }
+        changed = []
+        for ingredient_id, item in current.items():
+            if ingredient_id not in amounts:
+                deltas[ingredient_id] = -item.amount
+            elif deltas[ingredient_id]:
+                item.amount = amounts[ingredient_id]
+                changed.append(item)
+
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        )
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        removed = [
+            item.pk for ingredient_id, item in current.items()
+            if ingredient_id not in amounts
+        ]
+        if removed:
+            IngredientInRecipe.objects.filter(pk__in=removed).delete()
+        ShoppingListItem.objects.apply_deltas(recipe.pk, {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        })
+
+    def validate_tags(self, value):
+        missing = snapshots.tags.get_missing_ids(value)
+        if missing:
+            raise serializers.ValidationError(
+                self.error_messages['tag_does_not_exist'].format(
+                    pk_value=min(missing)
+                )
+            )
+        return value
+
     def validate(self, data):
         cooking_time = data.get('cooking_time')
         if cooking_time <= MIN_VALUE_ZERO:
@@ -271,6 +449,7 @@ class RecipePostSerializer(serializers.ModelSerializer):
             )
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         ingredients = validated_data.pop('ingredients')
@@ -281,6 +460,7 @@ class RecipePostSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -288,15 +468,25 @@ class RecipePostSerializer(serializers.ModelSerializer):
         instance = super().update(instance, validated_data)
 
         instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.save_ingredients(instance, ingredients)
+        self.update_ingredients(instance, ingredients)
 
         return instance
 
     def to_representation(self, instance):
+        instance = Recipe.objects.with_related().with_user_flags(
+            self.context.get('request').user
+        ).get(pk=instance.pk)
         return RecipeGetSerializer(instance, context=self.context).data
 
 
+class RecipeImageSerializer(serializers.ModelSerializer):
+    image = Base64ImageField(required=True)
+
+    class Meta:
+        model = Recipe
+        fields = ('image',)
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
@@ -337,3 +527,17 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
             instance.recipe,
             context=self.context
         ).data
+
+
+class ShortLinkClickSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShortLinkClick
+        fields = ('date', 'count')
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_IDS
+    )
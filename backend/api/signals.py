@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.images import image_variants_ready
+from core.signals import bulk_changed
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription
+from .cache import (
+    INGREDIENTS_VERSION,
+    RECIPES_LIST_VERSION,
+    RECIPES_SHARED_VERSION,
+    TAGS_VERSION,
+    bump_versions,
+    recipe_version_key,
+    user_version_key,
+)
+
+User = get_user_model()
+
+# Поля пользователя, которые попадают в выдачу рецептов.
+RECIPE_AUTHOR_FIELDS = frozenset(('username', 'first_name', 'last_name',
+                                  'avatar'))
+
+
+def invalidate_recipe(recipe_id):
+    transaction.on_commit(lambda: bump_versions(
+        RECIPES_LIST_VERSION, recipe_version_key(recipe_id)
+    ))
+
+
+def invalidate_user(user_id):
+    transaction.on_commit(lambda: bump_versions(user_version_key(user_id)))
+
+
+def invalidate_all_recipes(*keys):
+    transaction.on_commit(lambda: bump_versions(
+        RECIPES_LIST_VERSION, RECIPES_SHARED_VERSION, *keys
+    ))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipe(instance.pk)
+
+
+@receiver(bulk_changed, sender=Recipe)
+def recipes_bulk_changed(sender, **kwargs):
+    invalidate_all_recipes()
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        invalidate_all_recipes()
+    else:
+        invalidate_recipe(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(bulk_changed, sender=Tag)
+def tag_changed(sender, **kwargs):
+    invalidate_all_recipes(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(bulk_changed, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    invalidate_all_recipes(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def user_relations_changed(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(image_variants_ready, sender=Recipe)
+def recipe_image_variants_ready(sender, pk, **kwargs):
+    invalidate_recipe(pk)
+
+
+@receiver(image_variants_ready, sender=User)
+def avatar_variants_ready(sender, **kwargs):
+    invalidate_all_recipes()
+
+
+@receiver(pre_save, sender=User)
+def check_recipe_author_changed(sender, instance, update_fields=None,
+                                **kwargs):
+    fields = RECIPE_AUTHOR_FIELDS
+    if update_fields is not None:
+        fields &= set(update_fields)
+    previous = None
+    if instance.pk is not None and fields:
+        previous = sender.objects.filter(pk=instance.pk).only(*fields).first()
+    instance._recipe_author_changed = previous is not None and any(
+        field.value_to_string(previous) != field.value_to_string(instance)
+        for field in map(sender._meta.get_field, fields)
+    )
+
+
+@receiver(post_save, sender=User)
+def user_profile_changed(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_recipe_author_changed', False):
+        invalidate_all_recipes()
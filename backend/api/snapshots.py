@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+
+from recipes.models import Ingredient, Tag
+from .cache import INGREDIENTS_VERSION, TAGS_VERSION, get_versions
+
+
+class Snapshot:
+    def __init__(self, version, items):
+        self.version = version
+        self.items = tuple(items)
+        self.by_id = {item['id']: item for item in self.items}
+        self.json = JSONRenderer().render(self.items)
+
+
+class ReferenceData:
+    def __init__(self, model, fields, version_key):
+        self.model = model
+        self.fields = fields
+        self.version_key = version_key
+        self.snapshot = None
+
+    def get_snapshot(self):
+        version, = get_versions(self.version_key)
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = Snapshot(
+                version, self.model.objects.values(*self.fields)
+            )
+            self.snapshot = snapshot
+        return snapshot
+
+    def get_missing_ids(self, ids):
+        missing = set(ids) - self.get_snapshot().by_id.keys()
+        if missing:
+            missing -= set(self.model.objects.filter(
+                id__in=missing
+            ).values_list('id', flat=True))
+        return missing
+
+
+tags = ReferenceData(Tag, ('id', 'name', 'slug'), TAGS_VERSION)
+ingredients = ReferenceData(
+    Ingredient, ('id', 'name', 'measurement_unit'), INGREDIENTS_VERSION
+)
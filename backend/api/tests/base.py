@@ -0,0 +1,85 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_image_data():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 6), (200, 120, 80)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeAPITestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.user = (
+            User.objects.create_user(
+                username=username,
+                email=f'{username}@example.com',
+                password='kX7-mQ2-vR9',
+                first_name='Имя',
+                last_name='Фамилия'
+            )
+            for username in ('author', 'reader')
+        )
+        cls.tags = [
+            Tag.objects.create(name=name, slug=slug)
+            for name, slug in (
+                ('Завтрак', 'breakfast'),
+                ('Обед', 'lunch'),
+                ('Ужин', 'dinner'),
+            )
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f'Ингредиент {first}{second}', measurement_unit='г'
+            )
+            for first in 'абв'
+            for second in 'абвгдежзийклмнопрстуфхцчшщыэюя'
+        )
+        cls.ingredients = list(Ingredient.objects.order_by('id'))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user_client = APIClient()
+        self.user_client.force_authenticate(self.user)
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+
+    @classmethod
+    def create_recipe(cls, tags=(), ingredients=(), name='Рецепт'):
+        recipe = Recipe.objects.create(
+            author=cls.author,
+            name=name,
+            text='Описание',
+            image='recipes/images/test.png',
+            cooking_time=10
+        )
+        recipe.tags.set(tags)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients
+        )
+        return recipe
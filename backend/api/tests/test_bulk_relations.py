@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.db.models import Sum
+
+from foodgram.constants import (
+    BULK_STATUS_ABSENT,
+    BULK_STATUS_CREATED,
+    BULK_STATUS_DELETED,
+    BULK_STATUS_EXISTS,
+    BULK_STATUS_NOT_FOUND,
+)
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from .base import RecipeAPITestCase
+
+
+def get_stale_links(ids, linked):
+    # Результат предварительного чтения, устаревший к моменту записи:
+    # так воспроизводится параллельный запрос с теми же парами.
+    return mock.patch(
+        'api.utils.get_linked_ids',
+        return_value={pk: linked for pk in ids}
+    )
+
+
+class BulkRelationsTest(RecipeAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipes = [
+            cls.create_recipe(ingredients=cls.ingredients[:3])
+            for _ in range(3)
+        ]
+        cls.ids = [recipe.pk for recipe in cls.recipes]
+
+    def get_statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [result['status'] for result in response.data['results']]
+
+    def get_favorites_counts(self):
+        return list(Recipe.objects.filter(pk__in=self.ids).order_by(
+            'pk'
+        ).values_list('favorites_count', flat=True))
+
+    def test_create_reports_only_inserted_rows(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        with get_stale_links(self.ids, False):
+            response = self.user_client.post(
+                '/api/recipes/favorite/', {'ids': self.ids}, format='json'
+            )
+        self.assertEqual(self.get_statuses(response), [
+            BULK_STATUS_EXISTS, BULK_STATUS_CREATED, BULK_STATUS_CREATED
+        ])
+        self.assertEqual(self.get_favorites_counts(), [1, 1, 1])
+
+    def test_delete_reports_only_deleted_rows(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipes[1])
+        with get_stale_links(self.ids, True):
+            response = self.user_client.delete(
+                '/api/recipes/favorite/', {'ids': self.ids}, format='json'
+            )
+        self.assertEqual(self.get_statuses(response), [
+            BULK_STATUS_ABSENT, BULK_STATUS_DELETED, BULK_STATUS_ABSENT
+        ])
+        self.assertEqual(self.get_favorites_counts(), [0, 0, 0])
+
+    def test_shopping_list_follows_bulk_changes(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        with get_stale_links(self.ids, False):
+            self.user_client.post(
+                '/api/recipes/shopping_cart/', {'ids': self.ids},
+                format='json'
+            )
+        self.assertEqual(
+            ShoppingListItem.objects.filter(user=self.user).aggregate(
+                total=Sum('total_amount')
+            )['total'],
+            3 * 3 * 10
+        )
+        with get_stale_links(self.ids, True):
+            self.user_client.delete(
+                '/api/recipes/shopping_cart/', {'ids': self.ids[1:]},
+                format='json'
+            )
+        self.assertEqual(
+            list(ShoppingListItem.objects.filter(user=self.user).values_list(
+                'total_amount', flat=True
+            )),
+            [10, 10, 10]
+        )
+
+    def test_subscribe_counts_followers_once(self):
+        response = self.user_client.post(
+            '/api/users/subscribe/',
+            {'ids': [self.author.pk, self.author.pk, 10 ** 6]},
+            format='json'
+        )
+        self.assertEqual(self.get_statuses(response), [
+            BULK_STATUS_CREATED, BULK_STATUS_NOT_FOUND
+        ])
+        with get_stale_links([self.author.pk], False):
+            response = self.user_client.post(
+                '/api/users/subscribe/', {'ids': [self.author.pk]},
+                format='json'
+            )
+        self.assertEqual(self.get_statuses(response), [BULK_STATUS_EXISTS])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+User = get_user_model()
+
+
+class UserProfileInvalidationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='kX7-mQ2-vR9',
+            first_name='Имя',
+            last_name='Фамилия'
+        )
+
+    def assert_invalidations(self, count, save):
+        with mock.patch('api.signals.invalidate_all_recipes') as invalidate:
+            save()
+        self.assertEqual(invalidate.call_count, count)
+
+    def test_signup_keeps_cache(self):
+        self.assert_invalidations(0, lambda: User.objects.create_user(
+            username='reader',
+            email='reader@example.com',
+            password='kX7-mQ2-vR9',
+            first_name='Имя',
+            last_name='Фамилия'
+        ))
+
+    def test_password_change_keeps_cache(self):
+        self.user.set_password('vR9-kX7-mQ2')
+        self.assert_invalidations(
+            0, lambda: self.user.save(update_fields=['password'])
+        )
+        self.assert_invalidations(0, self.user.save)
+
+    def test_unchanged_profile_keeps_cache(self):
+        self.assert_invalidations(0, self.user.save)
+
+    def test_profile_change_invalidates(self):
+        self.user.first_name = 'Другое'
+        self.assert_invalidations(1, self.user.save)
+        self.user.username = 'renamed'
+        self.assert_invalidations(
+            1, lambda: self.user.save(update_fields=['username'])
+        )
+        self.user.avatar = 'users/avatars/new.png'
+        self.assert_invalidations(1, self.user.save)
@@ -0,0 +1,138 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory
+
+from api.filters import RecipeFilter
+from foodgram.constants import TAGS_MODE_ALL, TAGS_MODE_ANY
+from recipes.models import Recipe
+from .base import RecipeAPITestCase
+
+# Наборы тегов рецептов: индексы в RecipeAPITestCase.tags.
+RECIPE_TAGS = ((), (0,), (1,), (2,), (0, 1), (0, 2), (1, 2), (0, 1, 2)) * 2
+
+
+class RecipeTagFilterTest(RecipeAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe_tags = {
+            cls.create_recipe([cls.tags[index] for index in indexes]).pk: {
+                cls.tags[index].slug for index in indexes
+            }
+            for indexes in RECIPE_TAGS
+        }
+
+    def get_all_pages(self, url):
+        ids = []
+        count = None
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            if count is None:
+                count = response.data['count']
+            self.assertEqual(response.data['count'], count)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return count, ids
+
+    def assert_filtered(self, slugs, mode, expected):
+        query = '&'.join(f'tags={slug}' for slug in slugs)
+        count, ids = self.get_all_pages(
+            f'/api/recipes/?{query}&tags_mode={mode}&limit=3'
+        )
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(count, len(ids))
+        self.assertEqual(set(ids), expected)
+
+    def test_any(self):
+        slugs = {self.tags[0].slug, self.tags[1].slug}
+        self.assert_filtered(slugs, TAGS_MODE_ANY, {
+            pk for pk, recipe_slugs in self.recipe_tags.items()
+            if recipe_slugs & slugs
+        })
+
+    def test_all(self):
+        slugs = {self.tags[0].slug, self.tags[1].slug}
+        self.assert_filtered(slugs, TAGS_MODE_ALL, {
+            pk for pk, recipe_slugs in self.recipe_tags.items()
+            if slugs <= recipe_slugs
+        })
+
+    def test_single_tag(self):
+        slug = self.tags[2].slug
+        for mode in (TAGS_MODE_ANY, TAGS_MODE_ALL):
+            self.assert_filtered({slug}, mode, {
+                pk for pk, recipe_slugs in self.recipe_tags.items()
+                if slug in recipe_slugs
+            })
+
+    def test_default_mode_is_any(self):
+        slugs = [tag.slug for tag in self.tags]
+        count, ids = self.get_all_pages(
+            '/api/recipes/?' + '&'.join(f'tags={slug}' for slug in slugs)
+        )
+        self.assertEqual(count, len(ids))
+        self.assertEqual(set(ids), {
+            pk for pk, recipe_slugs in self.recipe_tags.items()
+            if recipe_slugs
+        })
+
+    def test_modes_are_cached_separately(self):
+        query = f'tags={self.tags[0].slug}&tags={self.tags[1].slug}'
+        counts = [
+            self.client.get(
+                f'/api/recipes/?{query}&tags_mode={mode}'
+            ).data['count']
+            for mode in (TAGS_MODE_ANY, TAGS_MODE_ALL, TAGS_MODE_ANY)
+        ]
+        self.assertEqual(counts, [12, 4, 12])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Разбор плана SQLite')
+class RecipeFilterPlanTest(RecipeAPITestCase):
+    def get_plan(self, query):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        queryset = RecipeFilter(
+            QueryDict(query), queryset=Recipe.objects.all(), request=request
+        ).qs
+        return queryset.explain().splitlines()
+
+    def assert_uses_index(self, query, columns, subqueries=1):
+        # Список рецептов сканируется целиком, а подзапросы EXISTS должны
+        # искать по уникальному индексу связи, а не сканировать её.
+        plan = self.get_plan(query)
+        lookups = [row for row in plan if 'SUBQUERY' not in row and (
+            ' SEARCH ' in row or ' SCAN ' in row
+        ) and 'recipes_recipe' not in row.split()]
+        self.assertEqual(len(lookups), subqueries, plan)
+        for row in lookups:
+            self.assertRegex(row, r' SEARCH \w+ USING (COVERING )?INDEX ')
+            self.assertIn(columns, row)
+
+    def test_tags_any(self):
+        self.assert_uses_index(
+            f'tags={self.tags[0].slug}&tags={self.tags[1].slug}'
+            f'&tags_mode={TAGS_MODE_ANY}',
+            '(recipe_id=? AND tag_id=?)'
+        )
+
+    def test_tags_all(self):
+        self.assert_uses_index(
+            f'tags={self.tags[0].slug}&tags={self.tags[1].slug}'
+            f'&tags_mode={TAGS_MODE_ALL}',
+            '(recipe_id=? AND tag_id=?)',
+            subqueries=2
+        )
+
+    def test_is_favorited(self):
+        self.assert_uses_index(
+            'is_favorited=1', '(user_id=? AND recipe_id=?)'
+        )
+
+    def test_is_in_shopping_cart(self):
+        self.assert_uses_index(
+            'is_in_shopping_cart=1', '(user_id=? AND recipe_id=?)'
+        )
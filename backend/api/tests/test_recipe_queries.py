@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+from .base import RecipeAPITestCase
+
+PAGE_SIZE = 10
+
+
+class RecipeListQueriesTest(RecipeAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index in range(PAGE_SIZE):
+            recipe = cls.create_recipe(
+                cls.tags[:index % 3 + 1],
+                cls.ingredients[index:index + 5]
+            )
+            if index % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if index % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscription.objects.create(user=cls.user, author=cls.author)
+
+    def get_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def assert_constant_queries(self, client, url):
+        response, expected = self.get_queries(client, url.format(limit=1))
+        self.assertEqual(len(response.data['results']), 1)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            response = client.get(url.format(limit=PAGE_SIZE))
+        self.assertEqual(len(response.data['results']), PAGE_SIZE)
+        return response
+
+    def test_anonymous_list(self):
+        self.assert_constant_queries(
+            self.client, '/api/recipes/?limit={limit}'
+        )
+
+    def test_user_list(self):
+        response = self.assert_constant_queries(
+            self.user_client, '/api/recipes/?limit={limit}'
+        )
+        recipes = response.data['results']
+        self.assertEqual(
+            sum(recipe['is_favorited'] for recipe in recipes), PAGE_SIZE // 2
+        )
+        self.assertTrue(
+            all(recipe['author']['is_subscribed'] for recipe in recipes)
+        )
+        self.assertTrue(all(
+            len(recipe['ingredients']) == 5 and recipe['tags']
+            for recipe in recipes
+        ))
+
+    def test_user_list_filtered(self):
+        self.assert_constant_queries(
+            self.user_client,
+            '/api/recipes/?limit={limit}&is_in_shopping_cart=0'
+        )
+
+    def test_detail(self):
+        small = self.create_recipe(self.tags[:1], self.ingredients[:1])
+        large = self.create_recipe(self.tags, self.ingredients)
+        for client in (self.client, self.user_client):
+            _, expected = self.get_queries(client, f'/api/recipes/{small.pk}/')
+            cache.clear()
+            with self.assertNumQueries(expected):
+                response = client.get(f'/api/recipes/{large.pk}/')
+            self.assertEqual(
+                len(response.data['ingredients']), len(self.ingredients)
+            )
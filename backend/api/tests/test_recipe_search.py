@@ -0,0 +1,42 @@
+from recipes.models import Recipe
+from .base import RecipeAPITestCase
+
+
+class RecipeSearchPaginationTest(RecipeAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Самое релевантное совпадение — самый старый рецепт, так что
+        # порядок по релевантности обратен порядку по дате.
+        cls.expected = [
+            Recipe.objects.create(
+                author=cls.author,
+                name=name,
+                text=text,
+                image='recipes/images/test.png',
+                cooking_time=10
+            ).pk
+            for name, text in (
+                ('Капуста тушеная', 'Капуста, морковь'),
+                ('Щи', 'Свекла, морковь, лук, картофель, капуста'),
+                ('Суп', 'Свекла, морковь, лук, картофель, укроп, '
+                        'петрушка, чеснок, перец, лавровый лист, капуста'),
+            )
+        ]
+
+    def get_ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [recipe['id'] for recipe in response.data['results']]
+
+    def test_search_keeps_relevance_order_with_cursor(self):
+        _, ids = self.get_ids('/api/recipes/?search=капуста')
+        self.assertEqual(ids, self.expected)
+        response, ids = self.get_ids('/api/recipes/?search=капуста&cursor=')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(response.data['count'], len(self.expected))
+
+    def test_cursor_without_search(self):
+        response, ids = self.get_ids('/api/recipes/?cursor=')
+        self.assertEqual(ids, list(reversed(self.expected)))
+        self.assertNotIn('count', response.data)
@@ -0,0 +1,70 @@
+from recipes.models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+from .base import RecipeAPITestCase, get_image_data
+
+INGREDIENTS_COUNT = 50
+# Включая SAVEPOINT и RELEASE вокруг транзакции сериализатора.
+CREATE_QUERIES = 12
+UPDATE_QUERIES = 17
+
+
+class RecipeWriteQueriesTest(RecipeAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Первый запрос загружает снимки тегов и ингредиентов.
+        self.create(self.ingredients[:1])
+
+    def get_data(self, ingredients, amount=10):
+        return {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': get_image_data(),
+            'tags': [tag.id for tag in self.tags[:2]],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient in ingredients
+            ],
+        }
+
+    def create(self, ingredients):
+        response = self.author_client.post(
+            '/api/recipes/', self.get_data(ingredients), format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def assert_write_queries(self, count):
+        ingredients = self.ingredients[:count]
+        with self.assertNumQueries(CREATE_QUERIES):
+            recipe_id = self.create(ingredients)
+        ShoppingCart.objects.create(user=self.user, recipe_id=recipe_id)
+
+        # Половина ингредиентов остаётся с новым количеством, половина
+        # удаляется и столько же добавляется.
+        updated = self.ingredients[count // 2:count // 2 + count]
+        with self.assertNumQueries(UPDATE_QUERIES):
+            response = self.author_client.put(
+                f'/api/recipes/{recipe_id}/',
+                self.get_data(updated, amount=20),
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(response.data['ingredients']), count)
+        self.assertEqual(
+            dict(IngredientInRecipe.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', 'amount')),
+            {ingredient.id: 20 for ingredient in updated}
+        )
+        self.assertEqual(
+            dict(ShoppingListItem.objects.filter(
+                user=self.user
+            ).values_list('ingredient_id', 'total_amount')),
+            {ingredient.id: 20 for ingredient in updated}
+        )
+
+    def test_small_recipe(self):
+        self.assert_write_queries(2)
+
+    def test_large_recipe(self):
+        self.assert_write_queries(INGREDIENTS_COUNT)
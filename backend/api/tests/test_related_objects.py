@@ -0,0 +1,85 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, ShoppingCart, ShoppingListItem
+from users.models import Subscription
+from .base import RecipeAPITestCase
+
+
+class RelatedObjectTest(RecipeAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipe(ingredients=cls.ingredients[:2])
+
+    def get_writes(self, method, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = method(url)
+        return response, [
+            query['sql'] for query in queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))
+        ]
+
+    def test_favorite_toggle(self):
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        response, queries = self.get_writes(self.user_client.post, url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['id'], self.recipe.pk)
+        # Вставка, счётчик и рецепт для ответа.
+        self.assertEqual(len(queries), 3, queries)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+        response, queries = self.get_writes(self.user_client.post, url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(queries), 2, queries)
+
+        response, queries = self.get_writes(self.user_client.delete, url)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(queries), 2, queries)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertFalse(Favorite.objects.exists())
+
+        response, queries = self.get_writes(self.user_client.delete, url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(queries), 2, queries)
+
+    def test_missing_target(self):
+        for url in (
+            '/api/recipes/1000000/favorite/',
+            '/api/recipes/1000000/shopping_cart/',
+            '/api/users/1000000/subscribe/',
+        ):
+            self.assertEqual(self.user_client.post(url).status_code, 404)
+            self.assertEqual(self.user_client.delete(url).status_code, 404)
+
+    def test_shopping_cart(self):
+        url = f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        self.assertEqual(self.user_client.post(url).status_code, 201)
+        self.assertTrue(ShoppingCart.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            list(ShoppingListItem.objects.filter(user=self.user).values_list(
+                'total_amount', flat=True
+            )),
+            [10, 10]
+        )
+        self.assertEqual(self.user_client.delete(url).status_code, 204)
+        self.assertFalse(ShoppingListItem.objects.exists())
+
+    def test_subscribe(self):
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        response = self.user_client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['id'], self.author.pk)
+        self.assertEqual(len(response.data['recipes']), 1)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(self.user_client.post(url).status_code, 400)
+        self.assertEqual(
+            self.author_client.post(url).status_code, 400
+        )
+        self.assertEqual(self.user_client.delete(url).status_code, 204)
+        self.assertFalse(Subscription.objects.exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
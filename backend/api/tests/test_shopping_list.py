@@ -0,0 +1,40 @@
+from unittest import mock
+
+from api.renderers import render_pdf
+from recipes.models import ShoppingCart
+from .base import RecipeAPITestCase
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListDownloadTest(RecipeAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        ShoppingCart.objects.create(
+            user=cls.user,
+            recipe=cls.create_recipe(ingredients=cls.ingredients[:3])
+        )
+
+    def test_text(self):
+        response = self.user_client.get(URL, {'format': 'txt'})
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(f'{self.ingredients[0].name} - 10 г', content)
+
+    def test_pdf(self):
+        response = self.user_client.get(URL, {'format': 'pdf'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_pdf_rendered_in_worker_pool(self):
+        with mock.patch('api.renderers.get_process_pool') as get_pool:
+            get_pool.return_value.submit.return_value.result.return_value = (
+                b'%PDF-'
+            )
+            response = self.user_client.get(URL, {'format': 'pdf'})
+        self.assertEqual(response.content, b'%PDF-')
+        function, lines, _ = get_pool.return_value.submit.call_args.args
+        self.assertIs(function, render_pdf)
+        self.assertEqual(len(lines), 2 + 3)
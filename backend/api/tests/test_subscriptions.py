@@ -0,0 +1,41 @@
+from users.models import Subscription
+from .base import RecipeAPITestCase
+
+RECIPES = 5
+
+
+class SubscriptionRecipesLimitTest(RecipeAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipes = [
+            cls.create_recipe(name=f'Рецепт {index}')
+            for index in range(RECIPES)
+        ]
+        Subscription.objects.create(user=cls.user, author=cls.author)
+
+    def get_recipe_ids(self, url):
+        response = self.user_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        [author] = response.data['results']
+        return [recipe['id'] for recipe in author['recipes']]
+
+    def test_limit(self):
+        latest = [recipe.pk for recipe in reversed(self.recipes)]
+        for url in (
+            '/api/users/subscriptions/?recipes_limit=2',
+            '/api/users/subscriptions/?recipe_limit=2',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.get_recipe_ids(url), latest[:2])
+        self.assertEqual(
+            len(self.get_recipe_ids('/api/users/subscriptions/')), RECIPES
+        )
+
+    def test_subscribe_limit(self):
+        Subscription.objects.all().delete()
+        response = self.user_client.post(
+            f'/api/users/{self.author.pk}/subscribe/?recipes_limit=3'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['recipes']), 3)
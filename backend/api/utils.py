@@ -1,7 +1,43 @@
+from django.db import connections, transaction
+from django.db.models import Exists, F, OuterRef
 from django.shortcuts import get_object_or_404
 
 from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator
+
+from foodgram.constants import (
+    BULK_STATUS_ABSENT,
+    BULK_STATUS_CREATED,
+    BULK_STATUS_DELETED,
+    BULK_STATUS_EXISTS,
+    BULK_STATUS_INVALID,
+    BULK_STATUS_NOT_FOUND,
+)
+from .serializers import BulkIdsSerializer
+from .signals import invalidate_user
+
+
+def get_image_data(request, field_name):
+    if request.content_type.startswith('image/'):
+        return {field_name: request.data['file']}
+    return request.data
+
+
+def get_unique_message(serializer_class):
+    return next(
+        validator.message for validator in serializer_class.Meta.validators
+        if isinstance(validator, UniqueTogetherValidator)
+    )
+
+
+def get_target_id(pk):
+    try:
+        return int(pk)
+    except (TypeError, ValueError):
+        raise NotFound
 
 
 def create_related_object(
@@ -10,20 +46,44 @@ def create_related_object(
     model,
     serializer_class,
     field_name,
+    on_create=None,
     **kwargs
 ):
-    obj = get_object_or_404(model, id=kwargs['pk'])
+    pk = get_target_id(kwargs['pk'])
 
-    serializer = serializer_class(
-        data={field_name: obj.id},
-        context={'request': request}
-    )
-    serializer.is_valid(raise_exception=True)
-    serializer.save()
+    serializer = serializer_class(context={'request': request})
+    validate_field = getattr(serializer, f'validate_{field_name}', None)
+    if validate_field:
+        try:
+            validate_field(model(pk=pk))
+        except ValidationError as error:
+            raise ValidationError({field_name: error.detail})
+
+    # Одна вставка проверяет и существование цели, и уникальность пары;
+    # отдельный запрос нужен только, чтобы объяснить отказ.
+    related_model = serializer_class.Meta.model
+    with transaction.atomic():
+        created = insert_links(request.user, related_model, field_name, [pk])
+        if created:
+            if on_create:
+                on_create(created)
+            invalidate_user(request.user.pk)
+    if not created:
+        if not model.objects.filter(pk=pk).exists():
+            raise NotFound
+        raise ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                get_unique_message(serializer_class)
+            ]
+        })
 
+    instance = related_model(
+        user=request.user,
+        **{field_name: get_object_or_404(model, pk=pk)}
+    )
     return Response(
         status=status.HTTP_201_CREATED,
-        data=serializer.data
+        data=serializer_class(instance, context={'request': request}).data
     )
 
 
@@ -32,19 +92,181 @@ def delete_related_object(
     model,
     related_model,
     field_name,
+    on_delete=None,
     **kwargs
 ):
-    obj = get_object_or_404(model, id=kwargs['pk'])
+    pk = get_target_id(kwargs['pk'])
+    with transaction.atomic():
+        deleted = delete_links(request.user, related_model, field_name, [pk])
+        if deleted:
+            if on_delete:
+                on_delete(deleted)
+            invalidate_user(request.user.pk)
 
-    deleted_count, _ = related_model.objects.filter(
-        user=request.user,
-        **{field_name: obj}
-    ).delete()
-
-    if deleted_count == 0:
+    if not deleted:
+        get_object_or_404(model, pk=pk)
         return Response(
             {'errors': 'Объект не найден.'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
     return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def change_counter(model, field_name, ids, delta):
+    queryset = model.objects.filter(pk__in=ids)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field_name}__gte': -delta})
+    queryset.update(**{field_name: F(field_name) + delta})
+
+
+def get_bulk_ids(request):
+    serializer = BulkIdsSerializer(
+        data=request.data or {'ids': request.query_params.getlist('ids')}
+    )
+    serializer.is_valid(raise_exception=True)
+    return list(dict.fromkeys(serializer.validated_data['ids']))
+
+
+def get_linked_ids(request, model, related_model, field_name, ids):
+    return dict(model.objects.filter(id__in=ids).annotate(
+        linked=Exists(related_model.objects.filter(
+            user=request.user,
+            **{field_name: OuterRef('pk')}
+        ))
+    ).values_list('id', 'linked'))
+
+
+def get_link_sql(related_model, field_name):
+    connection = connections[related_model.objects.db]
+    quote = connection.ops.quote_name
+    opts = related_model._meta
+    field = opts.get_field(field_name)
+    return connection, {
+        'table': quote(opts.db_table),
+        'user': quote(opts.get_field('user').column),
+        'column': quote(field.column),
+        'target_table': quote(field.related_model._meta.db_table),
+        'target_pk': quote(field.related_model._meta.pk.column),
+    }
+
+
+def insert_links(user, related_model, field_name, ids):
+    # RETURNING отдаёт только пары, записанные этим запросом: пару,
+    # которую параллельно вставил другой запрос, счётчики не учтут дважды.
+    connection, names = get_link_sql(related_model, field_name)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} ({user}, {column}) '
+            'SELECT %s, {target_pk} FROM {target_table} '
+            'WHERE {target_pk} IN ({placeholders}) '
+            'ON CONFLICT DO NOTHING RETURNING {column}'.format(
+                placeholders=placeholders, **names
+            ),
+            [user.pk, *ids]
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def delete_links(user, related_model, field_name, ids):
+    connection, names = get_link_sql(related_model, field_name)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {table} WHERE {user} = %s '
+            'AND {column} IN ({placeholders}) RETURNING {column}'.format(
+                placeholders=placeholders, **names
+            ),
+            [user.pk, *ids]
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+@transaction.atomic
+def bulk_create_related_objects(
+    request,
+    model,
+    related_model,
+    field_name,
+    on_create=None,
+    validate=None
+):
+    ids = get_bulk_ids(request)
+    linked = get_linked_ids(request, model, related_model, field_name, ids)
+
+    results, candidate_ids = {}, []
+    for pk in ids:
+        error = validate(pk) if validate else None
+        if pk not in linked:
+            results[pk] = {'id': pk, 'status': BULK_STATUS_NOT_FOUND}
+        elif error:
+            results[pk] = {
+                'id': pk, 'status': BULK_STATUS_INVALID, 'errors': error
+            }
+        elif linked[pk]:
+            results[pk] = {'id': pk, 'status': BULK_STATUS_EXISTS}
+        else:
+            candidate_ids.append(pk)
+
+    created_ids = set(
+        insert_links(request.user, related_model, field_name, candidate_ids)
+        if candidate_ids else ()
+    )
+    for pk in candidate_ids:
+        results[pk] = {
+            'id': pk,
+            'status': (
+                BULK_STATUS_CREATED if pk in created_ids
+                else BULK_STATUS_EXISTS
+            )
+        }
+    if created_ids:
+        # Вставка в обход ORM не отправляет сигналы: счётчики, агрегаты
+        # и версии кеша обновляются здесь одним запросом на всю пачку.
+        if on_create:
+            on_create(created_ids)
+        invalidate_user(request.user.pk)
+
+    return Response({'results': [results[pk] for pk in ids]})
+
+
+@transaction.atomic
+def bulk_delete_related_objects(
+    request,
+    model,
+    related_model,
+    field_name,
+    on_delete=None
+):
+    ids = get_bulk_ids(request)
+    linked = get_linked_ids(request, model, related_model, field_name, ids)
+
+    results, candidate_ids = {}, []
+    for pk in ids:
+        if pk not in linked:
+            results[pk] = {'id': pk, 'status': BULK_STATUS_NOT_FOUND}
+        elif not linked[pk]:
+            results[pk] = {'id': pk, 'status': BULK_STATUS_ABSENT}
+        else:
+            candidate_ids.append(pk)
+
+    deleted_ids = set(
+        delete_links(request.user, related_model, field_name, candidate_ids)
+        if candidate_ids else ()
+    )
+    for pk in candidate_ids:
+        results[pk] = {
+            'id': pk,
+            'status': (
+                BULK_STATUS_DELETED if pk in deleted_ids
+                else BULK_STATUS_ABSENT
+            )
+        }
+    if deleted_ids:
+        # Уменьшаем только то, что удалил этот запрос.
+        if on_delete:
+            on_delete(deleted_ids)
+        invalidate_user(request.user.pk)
+
+    return Response({'results': [results[pk] for pk in ids]})
@@ -1,44 +1,76 @@
-import secrets
+from datetime import timedelta
+from functools import partial
 
 from django.contrib.auth import get_user_model, update_session_auth_hash
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.db.models import F, Max, Sum
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from foodgram.constants import SHORT_CODE_LENGTH
+from core.images import delete_image_variants
+from foodgram.constants import (
+    SELF_SUBSCRIPTION_MESSAGE,
+    SHOPPING_LIST_FILENAME,
+    SHORT_LINK_CLICK_DAYS,
+)
 from recipes.models import (
     Favorite,
-    Ingredient,
-    IngredientInRecipe,
     Recipe,
     ShoppingCart,
-    ShortLink,
-    Tag,
+    ShoppingListItem,
+    ShortLinkClick,
 )
+from recipes.short_codes import get_short_code
 from users.models import Subscription
-from .filters import IngredientFilter, RecipeFilter
+from .cache import (
+    RECIPES_LIST_VERSION,
+    RECIPES_SHARED_VERSION,
+    cached_response,
+    conditional_response,
+    get_last_modified,
+    get_request_versions,
+    recipe_detail_cache_key,
+    recipe_list_cache_key,
+    recipe_version_key,
+)
+from .filters import RecipeFilter
 from .pagination import CustomPagination
-from .permissions import IsAuthorOrAdminOrReadOnlyPermission
+from .parsers import IMAGE_PARSERS
+from .permissions import (
+    IsAuthorOrAdminOrReadOnlyPermission,
+    IsAuthorPermission,
+)
+from .renderers import SHOPPING_LIST_RENDERERS
 from .serializers import (
     AvatarSerializer,
     FavoriteSerializer,
-    IngredientSerializer,
     RecipeGetSerializer,
+    RecipeImageSerializer,
     RecipePostSerializer,
     ShoppingCartSerializer,
+    ShortLinkClickSerializer,
     SubscriptionSerializer,
-    TagSerializer,
     UserGetSerializer,
     UserPostSerializer,
     UserWithRecipesSerializer,
 )
-from .utils import create_related_object, delete_related_object
+from .search import ingredient_search
+from .snapshots import ingredients, tags
+from .utils import (
+    bulk_create_related_objects,
+    bulk_delete_related_objects,
+    change_counter,
+    create_related_object,
+    delete_related_object,
+    get_image_data,
+)
 
 User = get_user_model()
 
@@ -51,6 +83,7 @@ class UserViewSet(
 ):
     queryset = User.objects.all()
     pagination_class = CustomPagination
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
         if self.action == 'subscriptions':
@@ -89,7 +122,7 @@ class UserViewSet(
         )
         if serializer.is_valid():
             self.request.user.set_password(serializer.data['new_password'])
-            self.request.user.save()
+            self.request.user.save(update_fields=['password'])
             update_session_auth_hash(request, self.request.user)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -118,6 +151,9 @@ class UserViewSet(
             User,
             SubscriptionSerializer,
             'author',
+            on_create=partial(
+                change_counter, User, 'followers_count', delta=1
+            ),
             **kwargs
         )
 
@@ -128,20 +164,57 @@ class UserViewSet(
             User,
             Subscription,
             'author',
+            on_delete=partial(
+                change_counter, User, 'followers_count', delta=-1
+            ),
             **kwargs
         )
 
+    @action(
+        detail=False,
+        methods=['POST'],
+        permission_classes=[IsAuthenticated],
+        url_path='subscribe',
+        url_name='subscribe-bulk'
+    )
+    def subscribe_bulk(self, request):
+        return bulk_create_related_objects(
+            request,
+            User,
+            Subscription,
+            'author',
+            on_create=partial(
+                change_counter, User, 'followers_count', delta=1
+            ),
+            validate=lambda pk: (
+                SELF_SUBSCRIPTION_MESSAGE if pk == request.user.pk else None
+            )
+        )
+
+    @subscribe_bulk.mapping.delete
+    def unsubscribe_bulk(self, request):
+        return bulk_delete_related_objects(
+            request,
+            User,
+            Subscription,
+            'author',
+            on_delete=partial(
+                change_counter, User, 'followers_count', delta=-1
+            )
+        )
+
     @action(
         detail=False,
         methods=['PUT'],
         permission_classes=[IsAuthenticated],
-        url_path='me/avatar'
+        url_path='me/avatar',
+        parser_classes=IMAGE_PARSERS
     )
     def avatar(self, request):
         user = request.user
         serializer = AvatarSerializer(
             user,
-            data=request.data,
+            data=get_image_data(request, 'avatar'),
             partial=True
         )
         serializer.is_valid(raise_exception=True)
@@ -158,24 +231,61 @@ class UserViewSet(
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        delete_image_variants(user.avatar.storage, user.avatar_variants)
         user.avatar.delete(save=False)
         user.avatar = None
+        user.avatar_variants = {}
         user.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ingredient.objects.all()
-    serializer_class = IngredientSerializer
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
-    pagination_class = None
+class ReferenceDataViewSet(viewsets.ViewSet):
+    reference_data = None
 
+    def get_conditional_response(self, request, snapshot, get_response):
+        return conditional_response(
+            request,
+            get_response,
+            (request.get_full_path(), snapshot.version),
+            get_last_modified([snapshot.version])
+        )
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Tag.objects.all()
-    serializer_class = TagSerializer
-    pagination_class = None
+    def filter_items(self, items):
+        return items
+
+    def list(self, request):
+        snapshot = self.reference_data.get_snapshot()
+        if request.query_params:
+            get_response = partial(
+                Response, self.filter_items(snapshot.items)
+            )
+        else:
+            get_response = partial(
+                HttpResponse, snapshot.json, content_type='application/json'
+            )
+        return self.get_conditional_response(request, snapshot, get_response)
+
+    def retrieve(self, request, pk=None):
+        snapshot = self.reference_data.get_snapshot()
+        if not pk.isdigit() or int(pk) not in snapshot.by_id:
+            raise NotFound
+        return self.get_conditional_response(
+            request, snapshot, partial(Response, snapshot.by_id[int(pk)])
+        )
+
+
+class IngredientViewSet(ReferenceDataViewSet):
+    reference_data = ingredients
+
+    def filter_items(self, items):
+        name = self.request.query_params.get('name')
+        if name:
+            return ingredient_search.search(name)
+        return items
+
+
+class TagViewSet(ReferenceDataViewSet):
+    reference_data = tags
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -185,11 +295,84 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        if self.action in ['list', 'retrieve']:
+            return Recipe.objects.select_related('author').with_user_flags(
+                self.request.user
+            )
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return RecipeGetSerializer
         return RecipePostSerializer
 
+    def list(self, request, *args, **kwargs):
+        get_response = partial(super().list, request, *args, **kwargs)
+        if request.user.is_anonymous:
+            get_response = partial(
+                cached_response,
+                partial(recipe_list_cache_key, request),
+                get_response
+            )
+        last_modified = Recipe.objects.aggregate(
+            last_modified=Max('updated_at')
+        )['last_modified']
+        versions = get_request_versions(request, RECIPES_LIST_VERSION)
+        return conditional_response(
+            request,
+            get_response,
+            (
+                request.get_full_path(),
+                request.user.pk,
+                last_modified,
+                versions,
+            ),
+            get_last_modified(versions, last_modified)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        get_response = partial(super().retrieve, request, *args, **kwargs)
+        if not kwargs['pk'].isdigit():
+            return get_response()
+        if request.user.is_anonymous:
+            get_response = partial(
+                cached_response,
+                partial(recipe_detail_cache_key, request, kwargs['pk']),
+                get_response
+            )
+        updated_at = Recipe.objects.filter(pk=kwargs['pk']).values_list(
+            'updated_at', flat=True
+        ).first()
+        if updated_at is None:
+            return get_response()
+        versions = get_request_versions(
+            request,
+            recipe_version_key(kwargs['pk']),
+            RECIPES_SHARED_VERSION
+        )
+        return conditional_response(
+            request,
+            get_response,
+            (request.get_full_path(), request.user.pk, updated_at, versions),
+            get_last_modified(versions, updated_at)
+        )
+
+    @action(
+        methods=['PUT'],
+        detail=True,
+        parser_classes=IMAGE_PARSERS
+    )
+    def image(self, request, **kwargs):
+        serializer = RecipeImageSerializer(
+            self.get_object(),
+            data=get_image_data(request, 'image'),
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
     @action(
         methods=['POST'],
         detail=True,
@@ -202,6 +385,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
             Recipe,
             FavoriteSerializer,
             'recipe',
+            on_create=partial(
+                change_counter, Recipe, 'favorites_count', delta=1
+            ),
             **kwargs
         )
 
@@ -212,9 +398,42 @@ class RecipeViewSet(viewsets.ModelViewSet):
             Recipe,
             Favorite,
             'recipe',
+            on_delete=partial(
+                change_counter, Recipe, 'favorites_count', delta=-1
+            ),
             **kwargs
         )
 
+    @action(
+        methods=['POST'],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorite-bulk'
+    )
+    def favorite_bulk(self, request):
+        return bulk_create_related_objects(
+            request,
+            Recipe,
+            Favorite,
+            'recipe',
+            on_create=partial(
+                change_counter, Recipe, 'favorites_count', delta=1
+            )
+        )
+
+    @favorite_bulk.mapping.delete
+    def remove_favorite_bulk(self, request):
+        return bulk_delete_related_objects(
+            request,
+            Recipe,
+            Favorite,
+            'recipe',
+            on_delete=partial(
+                change_counter, Recipe, 'favorites_count', delta=-1
+            )
+        )
+
     @action(
         methods=['POST'],
         detail=True,
@@ -227,6 +446,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
             Recipe,
             ShoppingCartSerializer,
             'recipe',
+            on_create=partial(
+                ShoppingListItem.objects.add_recipes,
+                user_id=request.user.pk
+            ),
             **kwargs
         )
 
@@ -237,37 +460,91 @@ class RecipeViewSet(viewsets.ModelViewSet):
             Recipe,
             ShoppingCart,
             'recipe',
+            on_delete=partial(
+                ShoppingListItem.objects.remove_recipes,
+                user_id=request.user.pk
+            ),
             **kwargs
         )
 
-    def generate_shopping_list(self, ingredients):
-        return [
-            f'{ingredient["name"]} - '
-            f'{ingredient["amount"]} '
-            f'{ingredient["measurement_unit"]}'
-            for ingredient in ingredients
-        ]
-
     @action(
+        methods=['POST'],
         detail=False,
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk'
     )
-    def download_shopping_cart(self, request):
-        user = request.user
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shoppingcart_set__user=user
+    def shopping_cart_bulk(self, request):
+        return bulk_create_related_objects(
+            request,
+            Recipe,
+            ShoppingCart,
+            'recipe',
+            on_create=partial(
+                ShoppingListItem.objects.add_recipes,
+                user_id=request.user.pk
+            )
+        )
+
+    @shopping_cart_bulk.mapping.delete
+    def remove_shopping_cart_bulk(self, request):
+        return bulk_delete_related_objects(
+            request,
+            Recipe,
+            ShoppingCart,
+            'recipe',
+            on_delete=partial(
+                ShoppingListItem.objects.remove_recipes,
+                user_id=request.user.pk
+            )
+        )
+
+    def stream_shopping_list(self, request):
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user
         ).values(
             name=F('ingredient__name'),
-            measurement_unit=F('ingredient__measurement_unit')
-        ).annotate(amount=Sum('amount'))
-
-        shopping_list = self.generate_shopping_list(ingredients)
-        content = 'Список покупок:\n\n' + '\n'.join(shopping_list)
-        filename = 'Shopping_cart.txt'
-        response = HttpResponse(content, content_type='text/plain')
+            measurement_unit=F('ingredient__measurement_unit'),
+            amount=F('total_amount')
+        ).order_by('name', 'measurement_unit')
+
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        if renderer.streaming:
+            response = StreamingHttpResponse(
+                renderer.stream(ingredients.iterator()),
+                content_type=content_type
+            )
+        else:
+            response = HttpResponse(
+                renderer.render(ingredients.iterator()),
+                content_type=content_type
+            )
+        filename = f'{SHOPPING_LIST_FILENAME}.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS
+    )
+    def download_shopping_cart(self, request):
+        versions = get_request_versions(request, RECIPES_LIST_VERSION)
+        return conditional_response(
+            request,
+            partial(self.stream_shopping_list, request),
+            (
+                request.get_full_path(),
+                request.accepted_renderer.format,
+                request.user.pk,
+                versions,
+            ),
+            get_last_modified(versions)
+        )
+
     @action(
         detail=True,
         methods=['GET'],
@@ -275,13 +552,28 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path='get-link'
     )
     def get_link(self, request, **kwargs):
-        recipe = self.get_object()
-
-        short_link, created = ShortLink.objects.get_or_create(
-            recipe=recipe,
-            defaults={'short_code': secrets.token_urlsafe(SHORT_CODE_LENGTH)}
-        )
+        short_code = get_short_code(self.get_object())
 
         link = (f"{request.scheme}://{request.get_host()}"
-                f"/s/{short_link.short_code}/")
+                f"/s/{short_code}/")
         return Response({'short-link': link})
+
+    @action(
+        detail=True,
+        methods=['GET'],
+        permission_classes=[IsAuthorPermission]
+    )
+    def clicks(self, request, **kwargs):
+        # Переходы пишутся пачками, последние ещё могут быть в буфере.
+        clicks = ShortLinkClick.objects.filter(recipe=self.get_object())
+        return Response({
+            'total': clicks.aggregate(total=Sum('count'))['total'] or 0,
+            'days': ShortLinkClickSerializer(
+                clicks.filter(
+                    date__gt=timezone.localdate() - timedelta(
+                        days=SHORT_LINK_CLICK_DAYS
+                    )
+                ),
+                many=True
+            ).data
+        })
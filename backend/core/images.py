@@ -0,0 +1,122 @@
+import logging
+import os
+
+from django.db import connections, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from foodgram.constants import IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY
+from .workers import get_process_pool
+
+logger = logging.getLogger(__name__)
+
+image_variants_ready = Signal()
+
+
+def open_rgb(path):
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+
+
+def generate_image_variants(location, name, variants):
+    source = open_rgb(os.path.join(location, name))
+    root = os.path.splitext(name)[0]
+    generated = {}
+    for variant, (width, height, crop) in variants.items():
+        if crop:
+            image = ImageOps.fit(source, (width, height), Image.LANCZOS)
+        else:
+            image = source.copy()
+            image.thumbnail((width, height), Image.LANCZOS)
+        generated[variant] = {}
+        for image_format, extension in IMAGE_VARIANT_FORMATS:
+            variant_name = f'{root}.{variant}.{extension}'
+            image.save(
+                os.path.join(location, variant_name),
+                image_format.upper(),
+                quality=IMAGE_VARIANT_QUALITY
+            )
+            generated[variant][image_format] = variant_name
+    return {'source': name, 'variants': generated}
+
+
+def delete_image_variants(storage, generated):
+    for names in generated.get('variants', {}).values():
+        for name in names.values():
+            storage.delete(name)
+
+
+def delete_unused_image_variants(model, field_name, generated):
+    # Один исходник могут делить несколько строк (синтетические данные),
+    # поэтому варианты удаляются, только когда на него никто не ссылается.
+    source = generated.get('source')
+    if not source or model.objects.filter(**{field_name: source}).exists():
+        return
+    delete_image_variants(
+        model._meta.get_field(field_name).storage, generated
+    )
+
+
+def save_image_variants(model, pk, field_name, variants_field, result):
+    previous = model.objects.filter(pk=pk).values_list(
+        variants_field, flat=True
+    ).first()
+    updated = model.objects.filter(
+        pk=pk, **{field_name: result['source']}
+    ).update(**{variants_field: result})
+    if not updated:
+        return
+    # Варианты прежней картинки больше не нужны: имена файлов строятся
+    # от исходника, так что новые их не перезаписали.
+    if previous and previous.get('source') != result['source']:
+        delete_unused_image_variants(model, field_name, previous)
+    image_variants_ready.send(sender=model, pk=pk)
+
+
+def image_variants_done(model, pk, field_name, variants_field, future):
+    # Колбэк выполняется в служебном потоке пула, поэтому соединения
+    # с БД этого потока закрываются сразу после записи.
+    try:
+        save_image_variants(
+            model, pk, field_name, variants_field, future.result()
+        )
+    except FileNotFoundError:
+        # Картинку успели заменить или удалить до генерации вариантов.
+        logger.info(
+            'Исходник изображения %s #%s уже удалён', model, pk
+        )
+    except Exception:
+        logger.exception(
+            'Не удалось создать варианты изображения %s #%s', model, pk
+        )
+    finally:
+        connections.close_all()
+
+
+def submit_image_variants(instance, field_name, variants):
+    file = getattr(instance, field_name)
+    return get_process_pool().submit(
+        generate_image_variants, file.storage.location, file.name, variants
+    )
+
+
+def schedule_image_variants(instance, field_name, variants_field, variants):
+    file = getattr(instance, field_name)
+    generated = getattr(instance, variants_field)
+    if not file or generated.get('source') == file.name:
+        return
+
+    def submit():
+        submit_image_variants(
+            instance, field_name, variants
+        ).add_done_callback(lambda future: image_variants_done(
+            type(instance), instance.pk, field_name, variants_field, future
+        ))
+
+    transaction.on_commit(submit)
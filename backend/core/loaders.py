@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+from functools import partial
+from itertools import islice
+from pathlib import Path
+
+from django.db import connections, router, transaction
+
+from foodgram.constants import UPLOAD_CHUNK_SIZE
+from .signals import bulk_changed
+
+
+def iter_json_array(file):
+    # Потоковый разбор JSON-массива: в памяти держится только хвост
+    # прочитанных данных, а не весь файл.
+    decoder = json.JSONDecoder()
+    buffer, position, opened = '', 0, False
+    for chunk in iter(partial(file.read, UPLOAD_CHUNK_SIZE), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not opened:
+                if buffer[position] != '[':
+                    raise ValueError('Ожидается JSON-массив')
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            # Значение на границе чанка может быть обрезано.
+            if end == len(buffer):
+                break
+            yield item
+            position = end
+    raise ValueError('Незавершённый JSON-массив')
+
+
+def iter_csv(file, fields, headers):
+    reader = csv.reader(file)
+    first = next(reader, None)
+    if first is None:
+        return
+    columns = [headers.get(value.strip()) for value in first]
+    if all(columns):
+        fields = columns
+    else:
+        yield dict(zip(fields, first))
+    for row in reader:
+        yield dict(zip(fields, row))
+
+
+def read_records(path, fields, headers=None):
+    headers = {field: field for field in fields} | (headers or {})
+    path = Path(path)
+    with path.open(encoding='utf-8', newline='') as file:
+        if path.suffix.lower() == '.json':
+            records = iter_json_array(file)
+        else:
+            records = iter_csv(file, fields, headers)
+        for record in records:
+            yield {
+                field: str(record.get(field) or '').strip()
+                for field in fields
+            }
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class CsvStream:
+    # Файловый объект для COPY: строки сериализуются по мере чтения.
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.output = io.StringIO()
+        self.writer = csv.writer(self.output, lineterminator='\n')
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.buffer += self.output.getvalue()
+            self.output.seek(0)
+            self.output.truncate()
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def copy_rows(connection, model, fields, rows):
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    temp_table = quote(f'{model._meta.db_table}_load')
+    columns = ', '.join(
+        quote(model._meta.get_field(field).column) for field in fields
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {temp_table}')
+        cursor.execute(
+            f'CREATE TEMP TABLE {temp_table} ON COMMIT DROP AS '
+            f'SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY {temp_table} ({columns}) FROM STDIN WITH (FORMAT csv)',
+            CsvStream(rows)
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT {columns} FROM {temp_table} ON CONFLICT DO NOTHING'
+        )
+        return cursor.rowcount
+
+
+def insert_rows(connection, model, fields, rows, batch_size):
+    # ON CONFLICT DO NOTHING, а не bulk_create(ignore_conflicts): на SQLite
+    # тот превращается в INSERT OR IGNORE и молча глотает нарушения
+    # NOT NULL и CHECK, а upsert пропускает только конфликты уникальности.
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ', '.join(
+        quote(model._meta.get_field(field).column) for field in fields
+    )
+    batch_size = min(
+        batch_size, connection.ops.bulk_batch_size(fields, [None] * batch_size)
+    )
+    placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+    inserted = 0
+    with connection.cursor() as cursor:
+        for chunk in chunked(rows, batch_size):
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES '
+                f'{", ".join([placeholders] * len(chunk))} '
+                'ON CONFLICT DO NOTHING',
+                [value for row in chunk for value in row]
+            )
+            inserted += cursor.rowcount
+    return inserted
+
+
+def bulk_load(model, records, fields, key_fields, batch_size):
+    # Дубликаты отсекаются по ключу в памяти: ключи из базы читаются
+    # заранее, ON CONFLICT страхует от гонок. Пустые и слишком длинные
+    # значения, которые база не примет, считаются отдельно от дубликатов.
+    max_lengths = [model._meta.get_field(field).max_length for field in fields]
+    using = router.db_for_write(model)
+    connection = connections[using]
+    total = rejected = 0
+
+    def unique_rows():
+        nonlocal total, rejected
+        for record in records:
+            total += 1
+            row = tuple(record[field] for field in fields)
+            if not all(row) or any(
+                max_length and len(value) > max_length
+                for value, max_length in zip(row, max_lengths)
+            ):
+                rejected += 1
+                continue
+            key = tuple(record[field] for field in key_fields)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield row
+
+    with transaction.atomic(using=using):
+        seen = set(
+            model._base_manager.db_manager(using).values_list(
+                *key_fields
+            ).iterator()
+        )
+        if connection.vendor == 'postgresql':
+            inserted = copy_rows(connection, model, fields, unique_rows())
+        else:
+            inserted = insert_rows(
+                connection, model, fields, unique_rows(), batch_size
+            )
+        if inserted:
+            bulk_changed.send(sender=model, count=inserted)
+    return inserted, total - rejected - inserted, rejected
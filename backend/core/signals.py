@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Массовые изменения в обход save()/delete(): sender — изменённая модель.
+bulk_changed = Signal()
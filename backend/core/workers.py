@@ -0,0 +1,17 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def get_process_pool():
+    return ProcessPoolExecutor(max_workers=settings.WORKER_PROCESSES)
+
+
+def wait_for_workers():
+    # Дожидается поставленных задач и закрывает пул; следующий вызов
+    # get_process_pool создаст новый.
+    if get_process_pool.cache_info().currsize:
+        get_process_pool().shutdown(wait=True)
+        get_process_pool.cache_clear()
@@ -12,17 +12,69 @@ MIN_COOKING_TIME = 1
 MIN_INGREDIENT_AMOUNT = 1
 MIN_VALUE_ZERO = 0
 
-SHORT_CODE_LENGTH = 6
+SHORT_CODE_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+SHORT_CODE_ID_LENGTH = 6
+SHORT_CODE_SIGNATURE_LENGTH = 4
+SHORT_CODE_SALT = 'recipes.short_code'
+SHORT_CODE_CREATE_ATTEMPTS = 3
+LEGACY_SHORT_CODE_CACHE_TIMEOUT = 60 * 10
+SHORT_LINK_CLICK_DAYS = 30
 
 PAGE_SIZE = 6
 PAGE_SIZE_QUERY_PARAM = 'limit'
+CURSOR_QUERY_PARAM = 'cursor'
+
+RECIPE_CACHE_TIMEOUT = 60 * 10
+CACHE_VERSION_TIMEOUT = 60 * 10
+
+INGREDIENT_SEARCH_LIMIT = 30
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3
+RECIPE_SEARCH_CONFIGS = ('russian', 'english')
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+LOAD_BATCH_SIZE = 1000
+IMAGE_VARIANT_FORMATS = (('webp', 'webp'), ('jpeg', 'jpg'))
+IMAGE_VARIANT_QUALITY = 82
+RECIPE_IMAGE_VARIANTS = {
+    'card': (480, 360, True),
+    'detail': (1200, 1200, False),
+}
+AVATAR_IMAGE_VARIANTS = {
+    'avatar': (128, 128, True),
+}
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+SHOPPING_LIST_FILENAME = 'Shopping_cart'
+SHOPPING_LIST_FIELDS = ('name', 'amount', 'measurement_unit')
+SHOPPING_LIST_PDF_PAGE_SIZE = (827, 1169)
+SHOPPING_LIST_PDF_RESOLUTION = 100
+SHOPPING_LIST_PDF_MARGIN = 60
+SHOPPING_LIST_PDF_FONT_SIZE = 20
+SHOPPING_LIST_PDF_LINE_HEIGHT = 30
 
 NAME_REGEX = r'^[а-яА-ЯёЁa-zA-Z -]+$'
 
+BULK_MAX_IDS = 100
+BULK_STATUS_CREATED = 'created'
+BULK_STATUS_EXISTS = 'exists'
+BULK_STATUS_DELETED = 'deleted'
+BULK_STATUS_ABSENT = 'absent'
+BULK_STATUS_NOT_FOUND = 'not_found'
+BULK_STATUS_INVALID = 'invalid'
+SELF_SUBSCRIPTION_MESSAGE = 'Подписка на самого себя не возможна!'
+
 CHOICES_LIST = (
     ('0', 'False'),
     ('1', 'True')
 )
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
+TAGS_MODE_CHOICES = (
+    (TAGS_MODE_ANY, 'Любой из тегов'),
+    (TAGS_MODE_ALL, 'Все теги')
+)
 
 INVALID_NAME_MESSAGE = 'Введите корректное имя/название'
 MIN_COOKING_TIME_MESSAGE = 'Время приготовление должно быть не менее минуты'
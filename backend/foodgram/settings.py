@@ -73,6 +73,32 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+INGREDIENT_SEARCH_BACKEND = os.getenv('INGREDIENT_SEARCH_BACKEND', 'memory')
+
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', 2))
+
+SHORT_LINK_CLICK_BUFFER_SIZE = int(
+    os.getenv('SHORT_LINK_CLICK_BUFFER_SIZE', 100)
+)
+SHORT_LINK_CLICK_FLUSH_INTERVAL = int(
+    os.getenv('SHORT_LINK_CLICK_FLUSH_INTERVAL', 30)
+)
+
+SHOPPING_LIST_FONT_PATH = os.getenv(
+    'SHOPPING_LIST_FONT_PATH',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,6 +131,13 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+)
+
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Sum
 
 from .models import (
     Favorite,
@@ -6,7 +7,9 @@ from .models import (
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingListItem,
     ShortLink,
+    ShortLinkClick,
     Tag,
 )
 
@@ -20,13 +23,15 @@ class RecipeIngredientInline(admin.TabularInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     inlines = (RecipeIngredientInline,)
-    list_display = ('name', 'author', 'pub_date', 'favorite_count')
+    list_display = ('name', 'author', 'pub_date', 'favorites_count')
     list_filter = ('name', 'author')
     search_fields = ('name',)
 
-    @admin.display(description='В избранном')
-    def favorite_count(self, obj):
-        return obj.favorite_set.count()
+    def save_related(self, request, form, formsets, change):
+        if not change:
+            return super().save_related(request, form, formsets, change)
+        with ShoppingListItem.objects.recipe_changes(form.instance.pk):
+            super().save_related(request, form, formsets, change)
 
 
 @admin.register(Tag)
@@ -49,8 +54,33 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
 
 
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'total_amount')
+    list_select_related = ('user', 'ingredient')
+    search_fields = ('user__username', 'ingredient__name')
+
+
 @admin.register(ShortLink)
 class ShortLinkAdmin(admin.ModelAdmin):
-    list_display = ('short_code', 'recipe', 'created_at')
+    list_display = ('short_code', 'recipe', 'created_at', 'clicks')
+    list_select_related = ('recipe',)
     readonly_fields = ('short_code', 'created_at')
     search_fields = ('short_code', 'recipe__name')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            clicks_total=Sum('recipe__short_link_clicks__count')
+        )
+
+    @admin.display(description='Переходы', ordering='clicks_total')
+    def clicks(self, obj):
+        return obj.clicks_total or 0
+
+
+@admin.register(ShortLinkClick)
+class ShortLinkClickAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'date', 'count')
+    list_filter = ('date',)
+    list_select_related = ('recipe',)
+    search_fields = ('recipe__name',)
@@ -0,0 +1,68 @@
+import atexit
+import logging
+from collections import Counter
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import ShortLinkClick
+
+logger = logging.getLogger(__name__)
+
+
+class ClickBuffer:
+    # Переходы копятся в памяти воркера и пишутся одним upsert-ом, когда
+    # набирается size переходов или проходит interval секунд с последней
+    # записи. Интервал проверяется только на очередном переходе, остаток
+    # сбрасывается при штатной остановке воркера (atexit). При падении
+    # воркера теряется не больше size - 1 переходов; ошибка записи тоже
+    # отбрасывает только одну пачку.
+
+    def __init__(self, size, interval):
+        self.size = size
+        self.interval = interval
+        self.clicks = Counter()
+        self.pending = 0
+        self.flushed_at = monotonic()
+        self.lock = Lock()
+
+    def add(self, recipe_id):
+        with self.lock:
+            self.clicks[recipe_id, timezone.localdate()] += 1
+            self.pending += 1
+            if (
+                self.pending < self.size
+                and monotonic() - self.flushed_at < self.interval
+            ):
+                return
+            clicks = self.take()
+        self.write(clicks)
+
+    def take(self):
+        clicks, self.clicks = self.clicks, Counter()
+        self.pending = 0
+        self.flushed_at = monotonic()
+        return clicks
+
+    def write(self, clicks):
+        try:
+            ShortLinkClick.objects.add_clicks(clicks)
+        except DatabaseError:
+            logger.exception(
+                'Не удалось записать %s переходов', sum(clicks.values())
+            )
+
+    def flush(self):
+        with self.lock:
+            clicks = self.take()
+        self.write(clicks)
+
+
+click_buffer = ClickBuffer(
+    settings.SHORT_LINK_CLICK_BUFFER_SIZE,
+    settings.SHORT_LINK_CLICK_FLUSH_INTERVAL
+)
+atexit.register(click_buffer.flush)
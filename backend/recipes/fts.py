@@ -0,0 +1,59 @@
+# Полнотекстовый индекс рецептов на SQLite: FTS5-таблица с внешним
+# содержимым и триггеры, которые держат её в актуальном состоянии.
+# SQLite теряет триггеры, когда миграция пересоздаёт recipes_recipe
+# (AddField, AlterField и т. п.), поэтому такие миграции заканчиваются
+# RunPython(restore_triggers).
+TABLE = 'recipes_recipe_fts'
+CREATE_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    "name, text, content='recipes_recipe', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+TRIGGERS = {
+    f'{TABLE}_insert': (
+        f'CREATE TRIGGER IF NOT EXISTS {TABLE}_insert '
+        'AFTER INSERT ON recipes_recipe BEGIN '
+        f'INSERT INTO {TABLE}(rowid, name, text) '
+        'VALUES (new.id, new.name, new.text); END'
+    ),
+    f'{TABLE}_delete': (
+        f'CREATE TRIGGER IF NOT EXISTS {TABLE}_delete '
+        'AFTER DELETE ON recipes_recipe BEGIN '
+        f'INSERT INTO {TABLE}({TABLE}, rowid, name, text) '
+        "VALUES ('delete', old.id, old.name, old.text); END"
+    ),
+    f'{TABLE}_update': (
+        f'CREATE TRIGGER IF NOT EXISTS {TABLE}_update '
+        'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+        f'INSERT INTO {TABLE}({TABLE}, rowid, name, text) '
+        "VALUES ('delete', old.id, old.name, old.text); "
+        f'INSERT INTO {TABLE}(rowid, name, text) '
+        'VALUES (new.id, new.name, new.text); END'
+    ),
+}
+REBUILD = f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')"
+
+FORWARDS = (CREATE_TABLE, *TRIGGERS.values(), REBUILD)
+BACKWARDS = (
+    *(f'DROP TRIGGER IF EXISTS {name}' for name in reversed(TRIGGERS)),
+    f'DROP TABLE IF EXISTS {TABLE}',
+)
+
+
+def restore_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in (*TRIGGERS.values(), REBUILD):
+        schema_editor.execute(statement)
+
+
+def get_missing_triggers(connection):
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'recipes_recipe'"
+        )
+        existing = {name for name, in cursor.fetchall()}
+    return [name for name in TRIGGERS if name not in existing]
@@ -0,0 +1,64 @@
+from concurrent.futures import as_completed
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+
+from core.images import save_image_variants, submit_image_variants
+from foodgram.constants import AVATAR_IMAGE_VARIANTS, RECIPE_IMAGE_VARIANTS
+from recipes.models import Recipe
+
+User = get_user_model()
+
+TARGETS = (
+    (Recipe, 'image', 'image_variants', RECIPE_IMAGE_VARIANTS),
+    (User, 'avatar', 'avatar_variants', AVATAR_IMAGE_VARIANTS),
+)
+
+
+class Command(BaseCommand):
+    help = "Создание вариантов картинок рецептов и аватаров"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты даже для уже обработанных файлов'
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name, variants_field, variants in TARGETS:
+            futures = {}
+            for instance in model.objects.exclude(
+                **{f'{field_name}__isnull': True}
+            ).exclude(**{field_name: ''}).only(
+                'pk', field_name, variants_field
+            ).iterator():
+                generated = getattr(instance, variants_field)
+                source = getattr(instance, field_name).name
+                if not options['force'] and generated.get('source') == source:
+                    continue
+                futures[submit_image_variants(
+                    instance, field_name, variants
+                )] = instance.pk
+
+            failed = 0
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(
+                        f'{model._meta.verbose_name} #{futures[future]}: '
+                        f'{error}'
+                    )
+                    continue
+                save_image_variants(
+                    model, futures[future], field_name, variants_field, result
+                )
+
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: обработано '
+                f'{len(futures) - failed}, ошибок {failed}'
+            )
+
+        self.stdout.write(self.style.SUCCESS("Варианты картинок созданы"))
@@ -0,0 +1,72 @@
+from time import perf_counter_ns
+
+from django.core.cache import cache
+from django.core.management import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe, ShortLink
+from recipes.short_codes import (
+    decode_short_code,
+    legacy_code_key,
+    make_short_code,
+)
+from recipes.views import short_link_redirect
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = "Замер пропускной способности редиректа коротких ссылок"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000)
+
+    def measure(self, label, codes, total):
+        factory = RequestFactory()
+        requests = [
+            (factory.get(f'/s/{code}/'), code) for code in codes
+        ]
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for index in range(total):
+                request, code = requests[index % len(requests)]
+                started = perf_counter_ns()
+                short_link_redirect(request, code)
+                timings.append(perf_counter_ns() - started)
+        elapsed = sum(timings) / 10 ** 9
+        timings = sorted(timing / 1000 for timing in timings)
+        self.stdout.write(
+            f"{label}: {total / elapsed:.0f} запросов/с, "
+            f"запросов к БД: {len(queries)}, мкс: "
+            f"p50={percentile(timings, 0.5):.1f} "
+            f"p99={percentile(timings, 0.99):.1f}"
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        if not recipe_ids:
+            self.stdout.write(self.style.WARNING("Нет рецептов"))
+            return
+        self.measure(
+            "Подписанные коды",
+            [make_short_code(recipe_id) for recipe_id in recipe_ids],
+            total
+        )
+        legacy_codes = [
+            code for code in ShortLink.objects.values_list(
+                'short_code', flat=True
+            ) if decode_short_code(code) is None
+        ]
+        if legacy_codes:
+            cache.delete_many(
+                [legacy_code_key(code) for code in legacy_codes]
+            )
+            self.measure(
+                "Старые коды, холодный кэш", legacy_codes, len(legacy_codes)
+            )
+            self.measure("Старые коды, тёплый кэш", legacy_codes, total)
@@ -0,0 +1,332 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+from math import log
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from core.images import generate_image_variants
+from core.loaders import chunked
+from core.signals import bulk_changed
+from foodgram.constants import LOAD_BATCH_SIZE, RECIPE_IMAGE_VARIANTS
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+    Tag,
+    get_recipe_search_vector,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+FAKE_USERNAME_PREFIX = 'fake'
+FAKE_PASSWORD = 'fake-password'
+FAKE_IMAGE_NAME = 'recipes/images/fake_data.png'
+# Показатели степенного распределения: чем больше, тем сильнее перекос
+# в сторону популярных авторов, рецептов и ингредиентов.
+POPULARITY_EXPONENT = 1.1
+ACTIVITY_EXPONENT = 0.8
+TEXT_POOL_SIZE = 1000
+# Рецепты публикуются за последние --recipe-days дней, к настоящему всё
+# чаще: возраст — доля периода в степени RECIPE_AGE_EXPONENT.
+RECIPE_DAYS = 3 * 365
+RECIPE_AGE_EXPONENT = 2
+# VALUES, а не UNION ALL: в SQLite число частей составного SELECT
+# ограничено 500.
+UPDATE_PUB_DATES_SQL = '''
+    UPDATE recipes_recipe SET pub_date = spread.column2
+    FROM (VALUES {rows}) AS spread
+    WHERE recipes_recipe.id = spread.column1
+'''
+
+
+def zipf_cum_weights(count, exponent):
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class Skewed:
+    # Выбор значений по закону Ципфа; популярность не связана с id.
+    def __init__(self, rng, values, exponent):
+        self.rng = rng
+        self.values = list(values)
+        rng.shuffle(self.values)
+        self.cum_weights = zipf_cum_weights(len(self.values), exponent)
+
+    def choices(self, count):
+        return self.rng.choices(
+            self.values, cum_weights=self.cum_weights, k=count
+        )
+
+    def sample(self, count):
+        return list(dict.fromkeys(self.choices(count * 2)))[:count]
+
+
+def get_last_pk(model):
+    return model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+
+
+class Command(BaseCommand):
+    help = "Генерация синтетических данных для нагрузочного тестирования"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=10
+        )
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=5000)
+        parser.add_argument('--subscriptions', type=int, default=10000)
+        parser.add_argument('--recipe-days', type=int, default=RECIPE_DAYS)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=LOAD_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError(
+                "Сначала загрузите ингредиенты и теги: "
+                "load_ingredients_data, load_tags_data"
+            )
+        if options['users'] < 2 and options['subscriptions']:
+            raise CommandError("Для подписок нужно хотя бы два пользователя")
+
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        started = perf_counter()
+
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(
+            user_ids, options['recipes'], options['recipe_days']
+        )
+        self.create_recipe_relations(
+            recipe_ids,
+            Skewed(self.rng, ingredient_ids, POPULARITY_EXPONENT),
+            tag_ids,
+            options['ingredients_per_recipe']
+        )
+        users = Skewed(self.rng, user_ids, ACTIVITY_EXPONENT)
+        recipes = Skewed(self.rng, recipe_ids, POPULARITY_EXPONENT)
+        authors = Skewed(self.rng, user_ids, POPULARITY_EXPONENT)
+        self.create_pairs(
+            Favorite, 'recipe', users, recipes, options['favorites']
+        )
+        self.create_pairs(
+            ShoppingCart, 'recipe', users, recipes, options['carts']
+        )
+        self.create_pairs(
+            Subscription,
+            'author',
+            users,
+            authors,
+            options['subscriptions'],
+            allow_self=False
+        )
+
+        self.stdout.write("Пересчёт производных данных...")
+        if connection.vendor == 'postgresql' and recipe_ids:
+            Recipe.objects.filter(pk__gte=recipe_ids[0]).update(
+                search_vector=get_recipe_search_vector()
+            )
+        call_command('reconcile_counters', stdout=self.stdout)
+        with transaction.atomic():
+            ShoppingListItem.objects.rebuild()
+            bulk_changed.send(sender=Recipe, count=len(recipe_ids))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Данные сгенерированы за {perf_counter() - started:.1f} с"
+            )
+        )
+
+    def report(self, model, count, started):
+        self.stdout.write(
+            f"{model._meta.verbose_name_plural}: создано {count} "
+            f"за {perf_counter() - started:.1f} с"
+        )
+
+    def bulk_create(self, model, objects):
+        with transaction.atomic():
+            model.objects.bulk_create(
+                objects, batch_size=self.batch_size, ignore_conflicts=True
+            )
+
+    def create_users(self, count):
+        started = perf_counter()
+        last_pk = get_last_pk(User)
+        password = make_password(FAKE_PASSWORD)
+        first_names = [self.fake.first_name() for _ in range(TEXT_POOL_SIZE)]
+        last_names = [self.fake.last_name() for _ in range(TEXT_POOL_SIZE)]
+        for numbers in chunked(
+            range(last_pk + 1, last_pk + count + 1), self.batch_size
+        ):
+            self.bulk_create(User, [
+                User(
+                    username=f'{FAKE_USERNAME_PREFIX}{number}',
+                    email=f'{FAKE_USERNAME_PREFIX}{number}@example.com',
+                    first_name=self.rng.choice(first_names),
+                    last_name=self.rng.choice(last_names),
+                    password=password,
+                )
+                for number in numbers
+            ])
+        user_ids = list(
+            User.objects.filter(pk__gt=last_pk).order_by('id').values_list(
+                'id', flat=True
+            )
+        )
+        self.report(User, len(user_ids), started)
+        return user_ids
+
+    def get_image(self):
+        # Одна картинка и её варианты на все рецепты: варианты удаляются,
+        # только когда на картинку не ссылается ни один рецепт, а генерация
+        # в пуле на миллион строк не нужна.
+        name = FAKE_IMAGE_NAME
+        if not default_storage.exists(name):
+            buffer = BytesIO()
+            Image.new('RGB', (1200, 900), (230, 180, 120)).save(
+                buffer, 'PNG'
+            )
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        return name, generate_image_variants(
+            default_storage.location, name, RECIPE_IMAGE_VARIANTS
+        )
+
+    def spread_pub_dates(self, recipe_ids, days):
+        # bulk_create ставит pub_date через auto_now_add, и метки миллиона
+        # рецептов расходятся на миллисекунды. Даты перезаписываются
+        # отдельно и сортируются вместе с id, как при настоящей публикации.
+        now = timezone.now()
+        period = timedelta(days=days)
+        pub_dates = sorted(
+            now - period * self.rng.random() ** RECIPE_AGE_EXPONENT
+            for _ in recipe_ids
+        )
+        adapt = connection.ops.adapt_datetimefield_value
+        for chunk in chunked(zip(recipe_ids, pub_dates), self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    UPDATE_PUB_DATES_SQL.format(
+                        rows=', '.join(['(%s, %s)'] * len(chunk))
+                    ),
+                    [
+                        value for recipe_id, pub_date in chunk
+                        for value in (recipe_id, adapt(pub_date))
+                    ]
+                )
+
+    def create_recipes(self, user_ids, count, days):
+        started = perf_counter()
+        last_pk = get_last_pk(Recipe)
+        image, image_variants = self.get_image()
+        names = [
+            self.fake.sentence(nb_words=3).rstrip('.')
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        texts = [
+            self.fake.paragraph(nb_sentences=5)
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        authors = Skewed(self.rng, user_ids, POPULARITY_EXPONENT)
+        for size in map(len, chunked(range(count), self.batch_size)):
+            self.bulk_create(Recipe, [
+                Recipe(
+                    author_id=author_id,
+                    name=self.rng.choice(names),
+                    text=self.rng.choice(texts),
+                    image=image,
+                    image_variants=image_variants,
+                    cooking_time=max(
+                        1, int(self.rng.lognormvariate(log(30), 0.6))
+                    ),
+                )
+                for author_id in authors.choices(size)
+            ])
+        recipe_ids = list(
+            Recipe.objects.filter(pk__gt=last_pk).order_by('id').values_list(
+                'id', flat=True
+            )
+        )
+        self.spread_pub_dates(recipe_ids, days)
+        self.report(Recipe, len(recipe_ids), started)
+        return recipe_ids
+
+    def create_recipe_relations(self, recipe_ids, ingredients, tag_ids,
+                                per_recipe):
+        started = perf_counter()
+        total = 0
+        max_tags = min(3, len(tag_ids))
+        for chunk in chunked(recipe_ids, self.batch_size):
+            items = []
+            recipe_tags = []
+            for recipe_id in chunk:
+                size = max(1, round(
+                    self.rng.lognormvariate(log(per_recipe), 0.4)
+                ))
+                items.extend(
+                    IngredientInRecipe(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=max(1, int(self.rng.lognormvariate(4, 1)))
+                    )
+                    for ingredient_id in ingredients.sample(size)
+                )
+                recipe_tags.extend(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                    for tag_id in self.rng.sample(
+                        tag_ids, self.rng.randint(1, max_tags)
+                    )
+                )
+            self.bulk_create(IngredientInRecipe, items)
+            self.bulk_create(Recipe.tags.through, recipe_tags)
+            total += len(items)
+        self.report(IngredientInRecipe, total, started)
+
+    def create_pairs(self, model, target_field, users, targets, count,
+                     allow_self=True):
+        # Повторы добираются, пока не наберётся count уникальных пар
+        # или распределение не перестанет давать новые.
+        started = perf_counter()
+        seen = set()
+        while len(seen) < count:
+            size = min(self.batch_size, count - len(seen))
+            pairs = {
+                (user_id, target_id)
+                for user_id, target_id in zip(
+                    users.choices(size), targets.choices(size)
+                )
+                if allow_self or user_id != target_id
+            } - seen
+            if not pairs:
+                break
+            seen |= pairs
+            self.bulk_create(model, [
+                model(user_id=user_id, **{f'{target_field}_id': target_id})
+                for user_id, target_id in sorted(pairs)
+            ])
+        self.report(model, len(seen), started)
@@ -1,40 +1,48 @@
-from csv import DictReader
+import csv
+from time import perf_counter
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 
+from core.loaders import bulk_load, read_records
+from foodgram.constants import LOAD_BATCH_SIZE
 from recipes.models import Ingredient
 
 
-ALREDY_LOADED_ERROR_MESSAGE = """
-If you need to reload the child data from the CSV file,
-first delete the db.sqlite3 file to destroy the database.
-Then, run `python manage.py migrate` for a new empty
-database with tables"""
-
-
 class Command(BaseCommand):
-    help = "Загрузка данных из ingredient.csv"
+    help = "Загрузка ингредиентов из CSV или JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='./data/ingredients.csv'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=LOAD_BATCH_SIZE
+        )
 
     def handle(self, *args, **options):
         self.stdout.write("Загрузка ингредиентов...")
 
-        count = 0
-        skipped = 0
-        for row in DictReader(
-            open('./data/ingredients.csv', encoding='utf-8')
-        ):
-            ingredient, created = Ingredient.objects.get_or_create(
-                name=row['name'],
-                measurement_unit=row['m_unit']
+        started = perf_counter()
+        try:
+            count, skipped, rejected = bulk_load(
+                Ingredient,
+                read_records(
+                    options['path'],
+                    ('name', 'measurement_unit'),
+                    {'m_unit': 'measurement_unit'}
+                ),
+                ('name', 'measurement_unit'),
+                ('name', 'measurement_unit'),
+                options['batch_size']
             )
-            if created:
-                count += 1
-            else:
-                skipped += 1
+        except (OSError, ValueError, csv.Error) as error:
+            raise CommandError(error)
 
         self.stdout.write(
             self.style.SUCCESS(
                 f'Успешно загружено {count} ингредиентов, '
-                f'пропущено дубликатов: {skipped}'
+                f'пропущено дубликатов: {skipped}, '
+                f'отклонено некорректных строк: {rejected}, '
+                f'время: {perf_counter() - started:.2f} с'
             )
         )
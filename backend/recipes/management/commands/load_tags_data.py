@@ -1,40 +1,42 @@
-from csv import DictReader
+import csv
+from time import perf_counter
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 
+from core.loaders import bulk_load, read_records
+from foodgram.constants import LOAD_BATCH_SIZE
 from recipes.models import Tag
 
 
-ALREDY_LOADED_ERROR_MESSAGE = """
-If you need to reload the child data from the CSV file,
-first delete the db.sqlite3 file to destroy the database.
-Then, run `python manage.py migrate` for a new empty
-database with tables"""
-
-
 class Command(BaseCommand):
-    help = "Загрузка данных из tags.csv"
+    help = "Загрузка тегов из CSV или JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='./data/tags.csv')
+        parser.add_argument(
+            '--batch-size', type=int, default=LOAD_BATCH_SIZE
+        )
 
     def handle(self, *args, **options):
         self.stdout.write("Загрузка тагов...")
 
-        count = 0
-        skipped = 0
-        for row in DictReader(open('./data/tags.csv', encoding='utf-8')):
-            tag, created = Tag.objects.get_or_create(
-                slug=row['slug'],
-                defaults={
-                    'name': row['name'],
-                }
+        started = perf_counter()
+        try:
+            count, skipped, rejected = bulk_load(
+                Tag,
+                read_records(options['path'], ('name', 'slug')),
+                ('name', 'slug'),
+                ('slug',),
+                options['batch_size']
             )
-            if created:
-                count += 1
-            else:
-                skipped += 1
+        except (OSError, ValueError, csv.Error) as error:
+            raise CommandError(error)
 
         self.stdout.write(
             self.style.SUCCESS(
                 f'Успешно загружено {count} тагов, '
-                f'пропущено дубликатов: {skipped}'
+                f'пропущено дубликатов: {skipped}, '
+                f'отклонено некорректных строк: {rejected}, '
+                f'время: {perf_counter() - started:.2f} с'
             )
         )
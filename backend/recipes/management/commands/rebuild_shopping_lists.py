@@ -0,0 +1,57 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Sum
+
+from recipes.models import IngredientInRecipe, ShoppingListItem
+
+
+def get_actual_items():
+    return {
+        (item['user'], item['ingredient']): item['total_amount']
+        for item in IngredientInRecipe.objects.values(
+            'ingredient',
+            user=F('recipe__shoppingcart_set__user')
+        ).filter(user__isnull=False).annotate(
+            total_amount=Sum('amount')
+        ).order_by()
+    }
+
+
+def get_stored_items():
+    return {
+        (item['user'], item['ingredient']): item['total_amount']
+        for item in ShoppingListItem.objects.values(
+            'user', 'ingredient', 'total_amount'
+        )
+    }
+
+
+class Command(BaseCommand):
+    help = "Пересборка агрегированных списков покупок пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить списки, не изменяя их'
+        )
+
+    def handle(self, *args, **options):
+        actual = get_actual_items()
+        stored = get_stored_items()
+        mismatched = {
+            key for key in actual.keys() | stored.keys()
+            if actual.get(key) != stored.get(key)
+        }
+        self.stdout.write(f'Расхождений в списках покупок: {len(mismatched)}')
+
+        if options['check']:
+            if mismatched:
+                raise CommandError('Списки покупок не согласованы')
+            self.stdout.write(self.style.SUCCESS("Списки покупок согласованы"))
+            return
+
+        with transaction.atomic():
+            ShoppingListItem.objects.rebuild()
+
+        self.stdout.write(self.style.SUCCESS("Списки покупок пересобраны"))
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+
+def actual_count(related_model, field_name):
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(
+                **{field_name: OuterRef('pk')}
+            ).order_by().values(field_name).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = "Пересчёт счётчиков избранного, рецептов и подписчиков"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Сверка счётчиков...")
+
+        with transaction.atomic():
+            for model, counter, related_model, field_name in COUNTERS:
+                actual = actual_count(related_model, field_name)
+                fixed = model.objects.exclude(
+                    **{counter: actual}
+                ).update(**{counter: actual})
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}.{counter}: '
+                    f'исправлено записей: {fixed}'
+                )
+
+        self.stdout.write(self.style.SUCCESS("Счётчики согласованы"))
@@ -1,53 +1,163 @@
+import json
+
 from django.core.management import BaseCommand
-from django.db.models import Count
+from django.db import connection, transaction
+
+from core.signals import bulk_changed
+from recipes.models import Ingredient, IngredientInRecipe, ShoppingListItem
+
+MERGE_TABLE = 'ingredient_merge'
+MERGE_ROWS_TABLE = 'ingredient_merge_rows'
+CREATE_MERGE_TABLE_SQL = {
+    'postgresql': f'''
+        CREATE TEMP TABLE {MERGE_TABLE} AS
+        SELECT (pair->>0)::bigint AS loser_id,
+               (pair->>1)::bigint AS survivor_id
+        FROM jsonb_array_elements(%s::jsonb) AS pair
+    ''',
+    'sqlite': f'''
+        CREATE TEMP TABLE {MERGE_TABLE} AS
+        SELECT json_extract(value, '$[0]') AS loser_id,
+               json_extract(value, '$[1]') AS survivor_id
+        FROM json_each(%s)
+    ''',
+}
+# Строки владельца (рецепта или пользователя), которые после перепривязки
+# попадут на один ингредиент: остаётся строка с меньшим id и суммой.
+CREATE_MERGE_ROWS_SQL = f'''
+    CREATE TEMP TABLE {MERGE_ROWS_TABLE} AS
+    SELECT item.{{owner}} AS owner_id,
+           COALESCE(pair.survivor_id, item.{{ingredient}}) AS ingredient_id,
+           MIN(item.id) AS keep_id,
+           SUM(item.{{amount}}) AS amount
+    FROM {{table}} AS item
+    LEFT JOIN {MERGE_TABLE} AS pair ON pair.loser_id = item.{{ingredient}}
+    WHERE item.{{ingredient}} IN (SELECT loser_id FROM {MERGE_TABLE})
+       OR item.{{ingredient}} IN (SELECT survivor_id FROM {MERGE_TABLE})
+    GROUP BY item.{{owner}}, COALESCE(pair.survivor_id, item.{{ingredient}})
+    HAVING COUNT(*) > 1
+'''
+UPDATE_MERGED_AMOUNTS_SQL = f'''
+    UPDATE {{table}} SET {{amount}} = (
+        SELECT merged.amount FROM {MERGE_ROWS_TABLE} AS merged
+        WHERE merged.keep_id = {{table}}.id
+    )
+    WHERE id IN (SELECT keep_id FROM {MERGE_ROWS_TABLE})
+'''
+DELETE_MERGED_ROWS_SQL = f'''
+    DELETE FROM {{table}} WHERE id IN (
+        SELECT item.id FROM {{table}} AS item
+        LEFT JOIN {MERGE_TABLE} AS pair ON pair.loser_id = item.{{ingredient}}
+        JOIN {MERGE_ROWS_TABLE} AS merged
+            ON merged.owner_id = item.{{owner}}
+            AND merged.ingredient_id
+                = COALESCE(pair.survivor_id, item.{{ingredient}})
+        WHERE item.id <> merged.keep_id
+    )
+'''
+REPOINT_ROWS_SQL = f'''
+    UPDATE {{table}} SET {{ingredient}} = (
+        SELECT pair.survivor_id FROM {MERGE_TABLE} AS pair
+        WHERE pair.loser_id = {{table}}.{{ingredient}}
+    )
+    WHERE {{ingredient}} IN (SELECT loser_id FROM {MERGE_TABLE})
+'''
+DELETE_LOSERS_SQL = f'''
+    DELETE FROM {{table}} WHERE id IN (SELECT loser_id FROM {MERGE_TABLE})
+'''
+RELATIONS = (
+    (IngredientInRecipe, 'recipe', 'amount'),
+    (ShoppingListItem, 'user', 'total_amount'),
+)
+
+
+def normalize(value):
+    return ' '.join(value.split()).casefold()
 
-from recipes.models import Ingredient
+
+def get_merge_pairs():
+    survivors = {}
+    pairs = []
+    for pk, name, unit in Ingredient.objects.order_by('id').values_list(
+        'id', 'name', 'measurement_unit'
+    ).iterator():
+        survivor = survivors.setdefault((normalize(name), normalize(unit)), pk)
+        if survivor != pk:
+            pairs.append((pk, survivor))
+    return pairs
+
+
+def merge_relation(cursor, model, owner_field, amount_field):
+    names = {
+        'table': model._meta.db_table,
+        'owner': model._meta.get_field(owner_field).column,
+        'ingredient': model._meta.get_field('ingredient').column,
+        'amount': model._meta.get_field(amount_field).column,
+    }
+    cursor.execute(f'DROP TABLE IF EXISTS {MERGE_ROWS_TABLE}')
+    cursor.execute(CREATE_MERGE_ROWS_SQL.format(**names))
+    cursor.execute(UPDATE_MERGED_AMOUNTS_SQL.format(**names))
+    cursor.execute(DELETE_MERGED_ROWS_SQL.format(**names))
+    merged = cursor.rowcount
+    cursor.execute(REPOINT_ROWS_SQL.format(**names))
+    return merged, cursor.rowcount
 
 
 class Command(BaseCommand):
     help = "Удаление дублирующих ингредиентов из базы данных"
 
-    def handle(self, *args, **options):
-        self.stdout.write("Поиск дублирующих ингредиентов...")
-
-        duplicates = (
-            Ingredient.objects
-            .values('name', 'measurement_unit')
-            .annotate(count=Count('id'))
-            .filter(count__gt=1)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Посчитать изменения и откатить транзакцию"
         )
 
-        total_removed = 0
-
-        for duplicate in duplicates:
-            ingredients = Ingredient.objects.filter(
-                name=duplicate['name'],
-                measurement_unit=duplicate['measurement_unit']
-            ).order_by('id')
+    def handle(self, *args, **options):
+        self.stdout.write("Поиск дублирующих ингредиентов...")
 
-            ingredients_to_remove = ingredients[1:]
-            count_to_remove = len(ingredients_to_remove)
+        pairs = get_merge_pairs()
+        if not pairs:
+            self.stdout.write(self.style.SUCCESS("Дубликатов не найдено"))
+            return
 
-            if count_to_remove > 0:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {MERGE_TABLE}')
+            cursor.execute(
+                CREATE_MERGE_TABLE_SQL[connection.vendor], [json.dumps(pairs)]
+            )
+            for model, owner_field, amount_field in RELATIONS:
+                merged, repointed = merge_relation(
+                    cursor, model, owner_field, amount_field
+                )
                 self.stdout.write(
-                    f"Удаляем {count_to_remove} дубликатов для "
-                    f"'{duplicate['name']} ({duplicate['measurement_unit']})'"
+                    f"{model._meta.verbose_name_plural}: "
+                    f"объединено {merged}, перепривязано {repointed}"
                 )
-
-                for ingredient in ingredients_to_remove:
-                    ingredient.delete()
-
-                total_removed += count_to_remove
+            cursor.execute(DELETE_LOSERS_SQL.format(
+                table=Ingredient._meta.db_table
+            ))
+            removed = cursor.rowcount
+            # Считается до отката, чтобы пробный запуск показал итог.
+            remaining = Ingredient.objects.count()
+            cursor.execute(f'DROP TABLE {MERGE_ROWS_TABLE}')
+            cursor.execute(f'DROP TABLE {MERGE_TABLE}')
+            if options['dry_run']:
+                transaction.set_rollback(True)
+            else:
+                bulk_changed.send(sender=Ingredient, count=removed)
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Всего удалено дублирующих ингредиентов: {total_removed}"
+                f"{'Будет удалено' if options['dry_run'] else 'Всего удалено'}"
+                f" дублирующих ингредиентов: {removed} "
+                f"в {len(set(survivor for _, survivor in pairs))} группах"
             )
         )
 
-        unique_count = Ingredient.objects.count()
         self.stdout.write(
             self.style.SUCCESS(
-                f"Осталось уникальных ингредиентов: {unique_count}"
+                f"{'Останется' if options['dry_run'] else 'Осталось'}"
+                f" уникальных ингредиентов: {remaining}"
             )
         )
@@ -0,0 +1,53 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+from recipes import fts
+
+POSTGRESQL_FORWARDS = (
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin '
+    'ON recipes_recipe USING gin (search_vector)',
+    "UPDATE recipes_recipe SET search_vector = "
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(text, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(text, '')), 'B')",
+)
+POSTGRESQL_BACKWARDS = (
+    'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin',
+)
+
+
+def run_on_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_ingredient_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                null=True,
+                verbose_name='Поисковый вектор'
+            ),
+        ),
+        migrations.RunPython(
+            run_on_vendor({
+                'postgresql': POSTGRESQL_FORWARDS,
+                'sqlite': fts.FORWARDS,
+            }),
+            run_on_vendor({
+                'postgresql': POSTGRESQL_BACKWARDS,
+                'sqlite': fts.BACKWARDS,
+            }),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+from recipes import fts
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_shopping_list_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Варианты картинки'),
+        ),
+        # На SQLite AddField пересоздаёт recipes_recipe вместе с триггерами.
+        migrations.RunPython(fts.restore_triggers, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,33 @@
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.db import connections, models
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Q,
+    UniqueConstraint,
+    Value,
+    Window,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
 from core.validators import name_validator
 from foodgram.constants import (
     INGREDIENT_NAME_MAX_LENGTH,
     INGREDIENT_UNIT_MAX_LENGTH,
     RECIPE_NAME_MAX_LENGTH,
+    RECIPE_SEARCH_CONFIGS,
     SHORT_CODE_MAX_LENGTH,
     TAG_NAME_MAX_LENGTH,
     TAG_SLUG_MAX_LENGTH,
@@ -61,6 +82,119 @@ class Tag(models.Model):
         return self.slug
 
 
+def get_recipe_search_vector():
+    vector = None
+    for config in RECIPE_SEARCH_CONFIGS:
+        for field, weight in (('name', 'A'), ('text', 'B')):
+            part = SearchVector(field, weight=weight, config=config)
+            vector = part if vector is None else vector + part
+    return vector
+
+
+def get_recipe_search_query(value):
+    query = None
+    for config in RECIPE_SEARCH_CONFIGS:
+        part = SearchQuery(value, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return query
+
+
+def get_fts5_query(value):
+    return ' '.join(
+        '"{}"*'.format(token.replace('"', '""')) for token in value.split()
+    )
+
+
+def get_recipe_prefetches():
+    return (
+        'tags',
+        Prefetch(
+            'IngredientsInRecipe',
+            queryset=IngredientInRecipe.objects.select_related('ingredient')
+        ),
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            *get_recipe_prefetches()
+        )
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+        )
+
+    def favorited_by(self, user):
+        return self.filter(Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ))
+
+    def in_shopping_cart_of(self, user):
+        return self.filter(Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ))
+
+    def with_tags(self, tag_ids, match_all=False):
+        recipe_tags = self.model.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        )
+        if not match_all:
+            return self.filter(Exists(recipe_tags.filter(tag_id__in=tag_ids)))
+        return self.filter(*(
+            Exists(recipe_tags.filter(tag_id=tag_id)) for tag_id in tag_ids
+        ))
+
+    def search(self, value):
+        vendor = connections[self.db].vendor
+        if vendor == 'postgresql':
+            query = get_recipe_search_query(value)
+            return self.filter(search_vector=query).annotate(
+                search_rank=SearchRank(F('search_vector'), query)
+            ).order_by('-search_rank', '-pub_date', '-id')
+        if vendor == 'sqlite':
+            query = get_fts5_query(value)
+            # Сначала отбираем совпадения одним MATCH, иначе коррелированный
+            # подзапрос ранга выполняет поиск заново для каждой строки.
+            return self.filter(id__in=RawSQL(
+                'SELECT rowid FROM recipes_recipe_fts '
+                'WHERE recipes_recipe_fts MATCH %s',
+                (query,)
+            )).annotate(search_rank=RawSQL(
+                'SELECT -bm25(recipes_recipe_fts, 10.0, 1.0) '
+                'FROM recipes_recipe_fts '
+                'WHERE recipes_recipe_fts MATCH %s '
+                'AND recipes_recipe_fts.rowid = recipes_recipe.id',
+                (query,)
+            )).order_by('-search_rank', '-pub_date', '-id')
+        return self.filter(Q(name__icontains=value) | Q(text__icontains=value))
+
+    def latest_per_author(self, limit):
+        ranked = self.annotate(
+            author_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=[F('pub_date').desc(), F('id').desc()],
+            )
+        ).order_by().values('id', 'author_rank')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) AS ranked WHERE author_rank <= %s',
+            (*params, limit)
+        ))
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -76,6 +210,11 @@ class Recipe(models.Model):
         'Картинка',
         upload_to='recipes/images/',
     )
+    image_variants = models.JSONField(
+        'Варианты картинки',
+        default=dict,
+        editable=False
+    )
     text = models.TextField(
         'Описание рецепта',
     )
@@ -96,6 +235,23 @@ class Recipe(models.Model):
         'Дата создания',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -180,6 +336,144 @@ class ShoppingCart(BaseUserRecipe):
         return f'{self.recipe.name} в списке покупок у {self.user.username}'
 
 
+SHOPPING_LIST_UPSERT_SQL = '''
+    INSERT INTO recipes_shoppinglistitem (user_id, ingredient_id, total_amount)
+    SELECT cart.user_id, item.ingredient_id, %s * SUM(item.amount)
+    FROM recipes_shoppingcart AS cart
+    JOIN recipes_ingredientinrecipe AS item ON item.recipe_id = cart.recipe_id
+    WHERE {condition}
+    GROUP BY cart.user_id, item.ingredient_id
+    ON CONFLICT (user_id, ingredient_id) DO UPDATE
+    SET total_amount =
+        recipes_shoppinglistitem.total_amount + EXCLUDED.total_amount
+'''
+# Для одного пользователя корзина не нужна: вызывающий код передаёт
+# рецепты, которые действительно добавлены или удалены, и строки корзины
+# к этому моменту уже могут быть удалены.
+SHOPPING_LIST_USER_UPSERT_SQL = '''
+    INSERT INTO recipes_shoppinglistitem (user_id, ingredient_id, total_amount)
+    SELECT %s, item.ingredient_id, %s * SUM(item.amount)
+    FROM recipes_ingredientinrecipe AS item
+    WHERE {condition}
+    GROUP BY item.ingredient_id
+    ON CONFLICT (user_id, ingredient_id) DO UPDATE
+    SET total_amount =
+        recipes_shoppinglistitem.total_amount + EXCLUDED.total_amount
+'''
+SHOPPING_LIST_DELTA_SQL = '''
+    INSERT INTO recipes_shoppinglistitem (user_id, ingredient_id, total_amount)
+    SELECT cart.user_id, delta.ingredient_id, delta.amount
+    FROM recipes_shoppingcart AS cart
+    CROSS JOIN ({deltas}) AS delta
+    WHERE cart.recipe_id = %s
+    ON CONFLICT (user_id, ingredient_id) DO UPDATE
+    SET total_amount =
+        recipes_shoppinglistitem.total_amount + EXCLUDED.total_amount
+'''
+SHOPPING_LIST_REBUILD_SQL = '''
+    INSERT INTO recipes_shoppinglistitem (user_id, ingredient_id, total_amount)
+    SELECT cart.user_id, item.ingredient_id, SUM(item.amount)
+    FROM recipes_shoppingcart AS cart
+    JOIN recipes_ingredientinrecipe AS item ON item.recipe_id = cart.recipe_id
+    GROUP BY cart.user_id, item.ingredient_id
+'''
+
+
+class ShoppingListItemManager(models.Manager):
+    def apply_recipes(self, recipe_ids, sign, user_id=None):
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        if user_id is None:
+            sql = SHOPPING_LIST_UPSERT_SQL.format(
+                condition=f'cart.recipe_id IN ({placeholders})'
+            )
+            params = [sign, *recipe_ids]
+        else:
+            sql = SHOPPING_LIST_USER_UPSERT_SQL.format(
+                condition=f'item.recipe_id IN ({placeholders})'
+            )
+            params = [user_id, sign, *recipe_ids]
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+        if sign < 0:
+            empty = self.filter(total_amount__lte=0)
+            if user_id is not None:
+                empty = empty.filter(user_id=user_id)
+            else:
+                empty = empty.filter(
+                    user__shoppingcart_set__recipe__in=recipe_ids
+                )
+            empty.delete()
+
+    def apply_deltas(self, recipe_id, deltas):
+        if not deltas:
+            return
+        params = [
+            value for item in deltas.items() for value in item
+        ] + [recipe_id]
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(SHOPPING_LIST_DELTA_SQL.format(
+                deltas=' UNION ALL '.join(
+                    ['SELECT %s AS ingredient_id, %s AS amount'] * len(deltas)
+                )
+            ), params)
+        if min(deltas.values()) < 0:
+            self.filter(
+                total_amount__lte=0,
+                user__shoppingcart_set__recipe=recipe_id
+            ).delete()
+
+    def add_recipes(self, recipe_ids, user_id=None):
+        self.apply_recipes(recipe_ids, 1, user_id)
+
+    def remove_recipes(self, recipe_ids, user_id=None):
+        self.apply_recipes(recipe_ids, -1, user_id)
+
+    @contextmanager
+    def recipe_changes(self, recipe_id):
+        self.remove_recipes([recipe_id])
+        yield
+        self.add_recipes([recipe_id])
+
+    def rebuild(self):
+        self.all().delete()
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(SHOPPING_LIST_REBUILD_SQL)
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.IntegerField('Общее количество')
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.ingredient.name} - {self.total_amount} '
+            f'{self.ingredient.measurement_unit} у {self.user.username}'
+        )
+
+
 class ShortLink(models.Model):
     recipe = models.OneToOneField(
         Recipe,
@@ -204,3 +498,60 @@ class ShortLink(models.Model):
 
     def __str__(self):
         return f'{self.short_code} -> {self.recipe.name}'
+
+
+SHORT_LINK_CLICKS_UPSERT_SQL = '''
+    INSERT INTO recipes_shortlinkclick (recipe_id, date, count)
+    SELECT click.recipe_id, click.date, click.count
+    FROM ({clicks}) AS click
+    JOIN recipes_recipe AS recipe ON recipe.id = click.recipe_id
+    WHERE click.count > 0
+    ON CONFLICT (recipe_id, date) DO UPDATE
+    SET count = recipes_shortlinkclick.count + EXCLUDED.count
+'''
+
+
+class ShortLinkClickManager(models.Manager):
+    def add_clicks(self, clicks):
+        # clicks: {(recipe_id, date): count}; переходы на удалённые
+        # рецепты отбрасываются join-ом.
+        if not clicks:
+            return
+        params = [
+            value for (recipe_id, date), count in clicks.items()
+            for value in (recipe_id, date, count)
+        ]
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(SHORT_LINK_CLICKS_UPSERT_SQL.format(
+                clicks=' UNION ALL '.join(
+                    ['SELECT %s AS recipe_id, %s AS date, %s AS count']
+                    * len(clicks)
+                )
+            ), params)
+
+
+class ShortLinkClick(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='short_link_clicks',
+        verbose_name='Рецепт'
+    )
+    date = models.DateField('Дата')
+    count = models.PositiveIntegerField('Переходы', default=0)
+
+    objects = ShortLinkClickManager()
+
+    class Meta:
+        verbose_name = 'Переходы по короткой ссылке'
+        verbose_name_plural = 'Переходы по коротким ссылкам'
+        ordering = ('-date',)
+        constraints = [
+            UniqueConstraint(
+                fields=('recipe', 'date'),
+                name='unique_short_link_click'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe.name} {self.date}: {self.count}'
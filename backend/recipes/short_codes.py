@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from foodgram.constants import (
+    LEGACY_SHORT_CODE_CACHE_TIMEOUT,
+    SHORT_CODE_ALPHABET,
+    SHORT_CODE_CREATE_ATTEMPTS,
+    SHORT_CODE_ID_LENGTH,
+    SHORT_CODE_SALT,
+    SHORT_CODE_SIGNATURE_LENGTH,
+)
+from .models import ShortLink
+
+BASE = len(SHORT_CODE_ALPHABET)
+ALPHABET_INDEX = {
+    char: index for index, char in enumerate(SHORT_CODE_ALPHABET)
+}
+SHORT_CODE_LENGTH = SHORT_CODE_ID_LENGTH + SHORT_CODE_SIGNATURE_LENGTH
+
+
+def encode_base62(value):
+    chars = []
+    while True:
+        value, remainder = divmod(value, BASE)
+        chars.append(SHORT_CODE_ALPHABET[remainder])
+        if not value:
+            return ''.join(reversed(chars))
+
+
+def decode_base62(code):
+    value = 0
+    for char in code:
+        index = ALPHABET_INDEX.get(char)
+        if index is None:
+            return None
+        value = value * BASE + index
+    return value
+
+
+def sign_recipe_id(recipe_id):
+    digest = salted_hmac(SHORT_CODE_SALT, str(recipe_id)).digest()
+    return encode_base62(
+        int.from_bytes(digest, 'big') % BASE ** SHORT_CODE_SIGNATURE_LENGTH
+    ).rjust(SHORT_CODE_SIGNATURE_LENGTH, SHORT_CODE_ALPHABET[0])
+
+
+def make_short_code(recipe_id):
+    # Фиксированная длина отличает новые коды от старых случайных
+    # (token_urlsafe(6) всегда даёт 8 символов).
+    return (
+        encode_base62(recipe_id).rjust(
+            SHORT_CODE_ID_LENGTH, SHORT_CODE_ALPHABET[0]
+        )
+        + sign_recipe_id(recipe_id)
+    )
+
+
+def decode_short_code(short_code):
+    if len(short_code) != SHORT_CODE_LENGTH:
+        return None
+    recipe_id = decode_base62(short_code[:SHORT_CODE_ID_LENGTH])
+    if not recipe_id or not constant_time_compare(
+        short_code[SHORT_CODE_ID_LENGTH:], sign_recipe_id(recipe_id)
+    ):
+        return None
+    return recipe_id
+
+
+def legacy_code_key(short_code):
+    return f'short_code:{short_code}'
+
+
+def resolve_legacy_code(short_code):
+    # Кэшируются только найденные коды: промахи по произвольным строкам
+    # не вытесняют настоящие ссылки, а удалённая ссылка перестаёт
+    # открываться не позже чем через LEGACY_SHORT_CODE_CACHE_TIMEOUT.
+    key = legacy_code_key(short_code)
+    recipe_id = cache.get(key)
+    if recipe_id is None:
+        recipe_id = ShortLink.objects.filter(
+            short_code=short_code
+        ).values_list('recipe_id', flat=True).first()
+        if recipe_id is not None:
+            cache.set(key, recipe_id, LEGACY_SHORT_CODE_CACHE_TIMEOUT)
+    return recipe_id
+
+
+def resolve_short_code(short_code):
+    return decode_short_code(short_code) or resolve_legacy_code(short_code)
+
+
+def get_short_code(recipe):
+    # Старые ссылки сохраняют свой код, новые получают детерминированный.
+    for attempt in range(SHORT_CODE_CREATE_ATTEMPTS):
+        try:
+            short_link, created = ShortLink.objects.get_or_create(
+                recipe=recipe,
+                defaults={'short_code': make_short_code(recipe.pk)}
+            )
+        except IntegrityError:
+            if attempt == SHORT_CODE_CREATE_ATTEMPTS - 1:
+                raise
+            continue
+        return short_link.short_code
@@ -0,0 +1,100 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.images import (
+    delete_unused_image_variants,
+    schedule_image_variants,
+)
+from foodgram.constants import RECIPE_IMAGE_VARIANTS
+
+from .models import (
+    Favorite,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+    get_recipe_search_vector,
+)
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    Recipe.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    User.objects.filter(
+        pk=instance.author_id, recipes_count__gt=0
+    ).update(recipes_count=F('recipes_count') - 1)
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_vector(sender, instance, using, update_fields=None,
+                         **kwargs):
+    if connections[using].vendor != 'postgresql':
+        return
+    if update_fields and not {'name', 'text'} & set(update_fields):
+        return
+    Recipe.objects.using(using).filter(pk=instance.pk).update(
+        search_vector=get_recipe_search_vector()
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipes(
+            [instance.recipe_id], instance.user_id
+        )
+
+
+# pre_delete, а не post_delete: при каскадном удалении рецепта его
+# ингредиенты к моменту post_delete корзины уже могут быть удалены.
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    ShoppingListItem.objects.remove_recipes(
+        [instance.recipe_id], instance.user_id
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def generate_recipe_image_variants(sender, instance, update_fields=None,
+                                   **kwargs):
+    if update_fields and 'image' not in update_fields:
+        return
+    schedule_image_variants(
+        instance, 'image', 'image_variants', RECIPE_IMAGE_VARIANTS
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_image_variants(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        delete_unused_image_variants, Recipe, 'image',
+        instance.image_variants
+    ))
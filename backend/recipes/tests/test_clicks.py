@@ -0,0 +1,113 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import TestCase
+
+from recipes import clicks
+from recipes.clicks import ClickBuffer
+from recipes.models import Recipe, ShortLinkClick
+
+User = get_user_model()
+
+TODAY = date(2024, 3, 1)
+TOMORROW = date(2024, 3, 2)
+
+
+class ClickBufferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='kX7-mQ2-vR9'
+        )
+        cls.first, cls.second = (
+            Recipe.objects.create(
+                author=author,
+                name=name,
+                text='Описание',
+                image='recipes/images/test.png',
+                cooking_time=10
+            )
+            for name in ('Первый', 'Второй')
+        )
+
+    def setUp(self):
+        self.now = 0
+        self.today = TODAY
+        for patcher in (
+            mock.patch.object(clicks, 'monotonic', lambda: self.now),
+            mock.patch.object(
+                clicks.timezone, 'localdate', lambda: self.today
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.buffer = ClickBuffer(size=5, interval=60)
+
+    def get_counts(self):
+        return {
+            (recipe_id, day): count
+            for recipe_id, day, count in ShortLinkClick.objects.values_list(
+                'recipe_id', 'date', 'count'
+            )
+        }
+
+    def add(self, *recipes):
+        for recipe in recipes:
+            self.buffer.add(recipe.pk)
+
+    def test_flush_by_size(self):
+        # Пока пачка не набрана, в БД ничего нет: при падении воркера
+        # теряется не больше size - 1 переходов.
+        self.add(self.first, self.first, self.second, self.first)
+        self.assertEqual(self.buffer.pending, self.buffer.size - 1)
+        self.assertEqual(self.get_counts(), {})
+        self.add(self.second)
+        self.assertEqual(self.buffer.pending, 0)
+        self.assertEqual(self.get_counts(), {
+            (self.first.pk, TODAY): 3,
+            (self.second.pk, TODAY): 2,
+        })
+
+    def test_flush_by_interval(self):
+        self.add(self.first)
+        self.now = self.buffer.interval - 1
+        self.add(self.first)
+        self.assertEqual(self.get_counts(), {})
+        self.now = self.buffer.interval
+        self.add(self.second)
+        self.assertEqual(self.get_counts(), {
+            (self.first.pk, TODAY): 2,
+            (self.second.pk, TODAY): 1,
+        })
+
+    def test_totals_by_day(self):
+        self.add(self.first, self.first, self.second)
+        self.today = TOMORROW
+        self.add(self.first, self.first)
+        self.add(self.first, self.second, self.second)
+        self.buffer.flush()
+        self.assertEqual(self.get_counts(), {
+            (self.first.pk, TODAY): 2,
+            (self.second.pk, TODAY): 1,
+            (self.first.pk, TOMORROW): 3,
+            (self.second.pk, TOMORROW): 2,
+        })
+
+    def test_deleted_recipe_clicks_dropped(self):
+        self.add(self.first, self.second)
+        self.second.delete()
+        self.buffer.flush()
+        self.assertEqual(self.get_counts(), {(self.first.pk, TODAY): 1})
+
+    def test_failed_write_drops_one_batch(self):
+        with mock.patch.object(
+            ShortLinkClick.objects, 'add_clicks', side_effect=DatabaseError
+        ), self.assertLogs(clicks.logger, 'ERROR'):
+            self.add(*[self.first] * self.buffer.size)
+        self.add(self.second)
+        self.buffer.flush()
+        self.assertEqual(self.get_counts(), {(self.second.pk, TODAY): 1})
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from recipes import fts
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class RecipeSearchIndexTest(TestCase):
+    def test_triggers_exist(self):
+        # Миграция, пересоздавшая recipes_recipe на SQLite без
+        # fts.restore_triggers, оставит поиск без новых рецептов.
+        self.assertEqual(fts.get_missing_triggers(connection), [])
+
+    def test_search_follows_changes(self):
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='kX7-mQ2-vR9'
+        )
+        recipe = Recipe.objects.create(
+            author=author,
+            name='Борщ',
+            text='Свекла и капуста',
+            image='recipes/images/test.png',
+            cooking_time=60
+        )
+        other = Recipe.objects.create(
+            author=author,
+            name='Капуста тушеная',
+            text='Тесто',
+            image='recipes/images/test.png',
+            cooking_time=90
+        )
+        self.assertEqual(
+            list(Recipe.objects.search('капуста')), [other, recipe]
+        )
+        recipe.name = 'Щи'
+        recipe.text = 'Щавель'
+        recipe.save()
+        self.assertEqual(list(Recipe.objects.search('капуста')), [other])
+        other.delete()
+        self.assertEqual(list(Recipe.objects.search('капуста')), [])
@@ -0,0 +1,56 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from recipes.models import Ingredient, Recipe, Tag
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class GenerateFakeDataTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_pub_dates_spread(self):
+        started = timezone.now()
+        call_command(
+            'generate_fake_data',
+            users=5,
+            recipes=200,
+            recipe_days=100,
+            favorites=0,
+            carts=0,
+            subscriptions=0,
+            stdout=StringIO()
+        )
+        pub_dates = list(
+            Recipe.objects.order_by('id').values_list('pub_date', flat=True)
+        )
+        self.assertEqual(len(pub_dates), 200)
+        self.assertEqual(pub_dates, sorted(pub_dates))
+        self.assertLess(pub_dates[-1], timezone.now())
+        self.assertGreater(
+            pub_dates[0], started - timedelta(days=100)
+        )
+        self.assertGreater(
+            pub_dates[-1] - pub_dates[0], timedelta(days=30)
+        )
+        # Даты сгущаются к настоящему: за последнюю половину периода
+        # опубликовано больше половины рецептов.
+        middle = started - timedelta(days=50)
+        self.assertGreater(
+            sum(pub_date > middle for pub_date in pub_dates), 100
+        )
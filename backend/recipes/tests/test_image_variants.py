@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+from concurrent.futures import Future
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core.images import (
+    generate_image_variants,
+    image_variants_done,
+    save_image_variants,
+)
+from foodgram.constants import RECIPE_IMAGE_VARIANTS
+from recipes.models import Recipe
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_variant_names(generated):
+    return [
+        name
+        for names in generated['variants'].values()
+        for name in names.values()
+    ]
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageVariantsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='kX7-mQ2-vR9'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def save_image(self, name):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), (200, 120, 80)).save(buffer, 'PNG')
+        name = default_storage.save(
+            f'recipes/images/{name}.png', ContentFile(buffer.getvalue())
+        )
+        return generate_image_variants(
+            default_storage.location, name, RECIPE_IMAGE_VARIANTS
+        )
+
+    def create_recipe(self, generated):
+        return Recipe.objects.create(
+            author=self.author,
+            name='Рецепт',
+            text='Описание',
+            image=generated['source'],
+            image_variants=generated,
+            cooking_time=10
+        )
+
+    def replace_image(self, recipe, generated):
+        recipe.image = generated['source']
+        recipe.save()
+        save_image_variants(
+            Recipe, recipe.pk, 'image', 'image_variants', generated
+        )
+
+    def assert_exist(self, generated, exist=True):
+        for name in get_variant_names(generated):
+            self.assertEqual(default_storage.exists(name), exist, name)
+
+    def test_replaced_image_variants_deleted(self):
+        old = self.save_image('old')
+        recipe = self.create_recipe(old)
+        new = self.save_image('new')
+        self.replace_image(recipe, new)
+        self.assert_exist(old, exist=False)
+        self.assert_exist(new)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, new)
+
+    def test_shared_image_variants_kept(self):
+        shared = self.save_image('shared')
+        recipe = self.create_recipe(shared)
+        self.create_recipe(shared)
+        self.replace_image(recipe, self.save_image('own'))
+        self.assert_exist(shared)
+
+    def test_deleted_recipe_variants_deleted(self):
+        generated = self.save_image('deleted')
+        recipe = self.create_recipe(generated)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assert_exist(generated, exist=False)
+
+    def test_deleted_source_not_reported_as_error(self):
+        future = Future()
+        future.set_exception(FileNotFoundError('recipes/images/gone.png'))
+        # Колбэк закрывает соединения своего потока, здесь это поток теста.
+        with mock.patch('core.images.connections'), self.assertLogs(
+            'core.images', 'INFO'
+        ) as logs:
+            image_variants_done(
+                Recipe, 1, 'image', 'image_variants', future
+            )
+        self.assertEqual(
+            [record.levelname for record in logs.records], ['INFO']
+        )
@@ -0,0 +1,52 @@
+import tempfile
+from pathlib import Path
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+
+from core.loaders import bulk_load, insert_rows, read_records
+from recipes.models import Ingredient, Tag
+
+FIELDS = ('name', 'measurement_unit')
+
+
+class BulkLoadTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def load(self, content, model=Ingredient, fields=FIELDS, key=FIELDS):
+        path = self.directory / 'data.csv'
+        path.write_text(content, encoding='utf-8')
+        return bulk_load(model, read_records(path, fields), fields, key, 2)
+
+    def test_duplicates_and_rejected_counted_separately(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        self.assertEqual(self.load(
+            'соль,г\n'
+            'сахар,г\n'
+            'сахар,г\n'
+            ',г\n'
+            'перец,\n'
+            f'{"я" * 200},г\n'
+            '"кефир 2,5%",мл\n'
+        ), (2, 2, 3))
+        self.assertEqual(
+            set(Ingredient.objects.values_list(*FIELDS)),
+            {('соль', 'г'), ('сахар', 'г'), ('кефир 2,5%', 'мл')}
+        )
+
+    def test_conflict_on_other_unique_field_skipped(self):
+        # Ключ загрузки тегов — slug, но имя тоже уникально.
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+        self.assertEqual(self.load(
+            'Завтрак,morning\nОбед,lunch\n',
+            model=Tag, fields=('name', 'slug'), key=('slug',)
+        ), (1, 1, 0))
+
+    def test_not_null_violation_not_swallowed(self):
+        with self.assertRaises(IntegrityError):
+            insert_rows(
+                connection, Ingredient, FIELDS, [('соль', None)], 10
+            )
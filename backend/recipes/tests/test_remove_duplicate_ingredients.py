@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class RemoveDuplicateIngredientsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in (
+                ('соль', 'г'),
+                ('Соль', 'г'),
+                ('соль ', 'г'),
+                ('сахар', 'г'),
+                ('Сахар', 'г'),
+                ('перец', 'г'),
+            )
+        )
+
+    def call(self, *args):
+        output = StringIO()
+        call_command('remove_duplicate_ingredients', *args, stdout=output)
+        return output.getvalue()
+
+    def test_dry_run_reports_projected_count(self):
+        output = self.call('--dry-run')
+        self.assertIn('Будет удалено дублирующих ингредиентов: 3', output)
+        self.assertIn('Останется уникальных ингредиентов: 3', output)
+        self.assertEqual(Ingredient.objects.count(), 6)
+
+    def test_merge(self):
+        output = self.call()
+        self.assertIn('Всего удалено дублирующих ингредиентов: 3', output)
+        self.assertIn('Осталось уникальных ингредиентов: 3', output)
+        self.assertEqual(Ingredient.objects.count(), 3)
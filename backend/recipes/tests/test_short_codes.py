@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.models import Recipe, ShortLink
+from recipes.short_codes import (
+    legacy_code_key,
+    make_short_code,
+    resolve_short_code,
+)
+
+User = get_user_model()
+
+
+class LegacyShortCodeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='kX7-mQ2-vR9'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author,
+            name='Рецепт',
+            text='Описание',
+            image='recipes/images/test.png',
+            cooking_time=10
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_signed_code_resolves_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                resolve_short_code(make_short_code(self.recipe.pk)),
+                self.recipe.pk
+            )
+
+    def test_found_code_cached(self):
+        ShortLink.objects.create(recipe=self.recipe, short_code='Ab3_x-Yz')
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_short_code('Ab3_x-Yz'), self.recipe.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_short_code('Ab3_x-Yz'), self.recipe.pk)
+
+    def test_missing_code_not_cached(self):
+        self.assertIsNone(resolve_short_code('Ab3_x-Yz'))
+        self.assertIsNone(cache.get(legacy_code_key('Ab3_x-Yz')))
+        ShortLink.objects.create(recipe=self.recipe, short_code='Ab3_x-Yz')
+        self.assertEqual(resolve_short_code('Ab3_x-Yz'), self.recipe.pk)
@@ -1,11 +1,12 @@
 from django.shortcuts import redirect
 
-from .models import ShortLink
+from .clicks import click_buffer
+from .short_codes import resolve_short_code
 
 
 def short_link_redirect(request, short_code):
-    try:
-        short_link = ShortLink.objects.get(short_code=short_code)
-    except ShortLink.DoesNotExist:
+    recipe_id = resolve_short_code(short_code)
+    if recipe_id is None:
         return redirect('/not_found/')
-    return redirect(f'/recipes/{short_link.recipe.id}/')
+    click_buffer.add(recipe_id)
+    return redirect(f'/recipes/{recipe_id}/')
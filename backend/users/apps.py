@@ -6,3 +6,6 @@ class UsersConfig(AppConfig):
     name = 'users'
     verbose_name = 'Управление пользователями'
     verbose_name_plural = 'Управление пользователями'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -38,6 +38,21 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    avatar_variants = models.JSONField(
+        'Варианты аватара',
+        default=dict,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'last_name', 'first_name']
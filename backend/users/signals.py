@@ -0,0 +1,46 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.images import (
+    delete_unused_image_variants,
+    schedule_image_variants,
+)
+from foodgram.constants import AVATAR_IMAGE_VARIANTS
+
+from .models import Subscription, User
+
+
+@receiver(post_save, sender=Subscription)
+def increment_followers_count(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            followers_count=F('followers_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_followers_count(sender, instance, **kwargs):
+    User.objects.filter(
+        pk=instance.author_id, followers_count__gt=0
+    ).update(followers_count=F('followers_count') - 1)
+
+
+@receiver(post_save, sender=User)
+def generate_avatar_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields and 'avatar' not in update_fields:
+        return
+    schedule_image_variants(
+        instance, 'avatar', 'avatar_variants', AVATAR_IMAGE_VARIANTS
+    )
+
+
+@receiver(post_delete, sender=User)
+def delete_avatar_variants(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        delete_unused_image_variants, User, 'avatar',
+        instance.avatar_variants
+    ))